@@ -0,0 +1,68 @@
+import argparse
+import itertools
+import timeit
+
+import spacecraft
+
+
+def fuel_counter_upper_stages(mass):
+    '''
+    Reference exact fuel counter that walks every fuel stage with integer
+    arithmetic, used to check and time against the closed form.
+    '''
+    total_fuel = 0
+    fuel = mass // 3 - 2
+    while fuel > 0:
+        total_fuel += fuel
+        fuel = fuel // 3 - 2
+    return total_fuel
+
+
+def time_call(function, mass, number):
+    '''
+    Best time in seconds of a single call over a few repeats. Each call
+    gets a different mass, so cached results are never reused.
+    '''
+    spacecraft._fuel_counter_upper_chain.cache_clear()
+    offsets = itertools.count()
+    timer = timeit.Timer(lambda: function(mass + next(offsets)))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+if __name__ == "__main__":
+    # Parse CLI arguements
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-exponent", type=int, default=1000,
+                        help="Benchmark masses 10**k for k up to this value")
+    parser.add_argument("--number", type=int, default=10,
+                        help="Number of calls per timing")
+    args = parser.parse_args()
+
+    print("{:>8} {:>6} {:>14} {:>14} {:>14} {:>14}".format(
+        "mass", "bits", "recursive (s)", "stages (s)", "closed (s)",
+        "exact (s)"))
+
+    # Closely spaced around the switch from stages to the closed form
+    exponents = [1, 10, 50, 100, 150, 200, 250, 300, 1000, 3000, 10000]
+    for exponent in [e for e in exponents if e <= args.max_exponent]:
+        mass = 10 ** exponent + 7
+        exact = spacecraft.fuel_counter_upper_exact(mass)
+        assert exact == fuel_counter_upper_stages(mass)
+        assert exact == spacecraft._fuel_counter_upper_closed(mass + 3)
+
+        # The float based path overflows for masses beyond ~1e308
+        try:
+            uncached = spacecraft._fuel_counter_upper_chain.__wrapped__
+            recursive = "{:14.3e}".format(time_call(
+                lambda m: uncached(float(m)), mass, args.number))
+        except OverflowError:
+            recursive = "{:>14}".format("overflow")
+
+        stages = time_call(fuel_counter_upper_stages, mass, args.number)
+        closed = time_call(lambda m: spacecraft._fuel_counter_upper_closed(
+            m + 3), mass, args.number)
+        exact = time_call(spacecraft.fuel_counter_upper_exact, mass,
+                          args.number)
+        print("{:>8} {:>6} {} {:14.3e} {:14.3e} {:14.3e}".format(
+            "1e{}".format(exponent), mass.bit_length(), recursive, stages,
+            closed, exact))
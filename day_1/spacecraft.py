@@ -1,5 +1,14 @@
 import argparse
+import functools
 import math
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 def fuel_counter_upper(mass):
@@ -13,18 +22,42 @@ def fuel_counter_upper(mass):
     :return: The fuel requirement for the input mass.
     :rtype: float
     '''
-    fuel = math.floor(mass / 3) - 2
+    if isinstance(mass, int):
+        # Exact for integers beyond the precision of a float
+        fuel = mass // 3 - 2
+    else:
+        fuel = math.floor(mass / 3) - 2
     if fuel < 0:
         fuel = 0
     return fuel
 
 
+# Maximum number of masses remembered by the recursive fuel counter
+FUEL_CACHE_SIZE = 2 ** 16
+
+
+@functools.lru_cache(maxsize=FUEL_CACHE_SIZE)
+def _fuel_counter_upper_chain(mass):
+    '''
+    Determine the fuel required for a mass and all of its additional
+    fuel, iterating over each fuel stage. Results are kept in a bounded
+    LRU cache so repeated masses are answered without recomputation.
+    '''
+    total_fuel = 0
+    fuel = fuel_counter_upper(mass)
+    while fuel > 0:
+        total_fuel += fuel
+        fuel = fuel_counter_upper(fuel)
+    return total_fuel
+
+
 def fuel_counter_upper_recursive(mass, total_fuel=0):
     '''
     Determine fuel required for a module given its mass. Specifically,
     will divide mass by 3, round down, and subtract by 2. Also,
     calculate the additional fuel for the additional fuel's mass.
-    Recursively calculates till we reach a infinitesimal mass of fuel.
+    Calculates each stage till we reach a infinitesimal mass of fuel,
+    without recursion and with a cache of recent masses.
 
 
     :param mass: Mass of the module to calculate fuel for
@@ -34,16 +67,117 @@ def fuel_counter_upper_recursive(mass, total_fuel=0):
     :return: The fuel requirement for the input mass.
     :rtype: float
     '''
-    fuel = fuel_counter_upper(mass)
-    total_fuel += fuel
+    return total_fuel + _fuel_counter_upper_chain(mass)
 
-    if fuel <= 0:
-        return total_fuel
-    else:
-        return fuel_counter_upper_recursive(fuel, total_fuel)
+
+def _digit_sum(number, base=3):
+    '''
+    Sum of the digits of a non-negative integer in a given base. The
+    number is split in halves by squared powers of the base, so large
+    integers need far fewer divisions than taking one digit at a time.
+    '''
+    powers = [base]
+    while powers[-1] ** 2 <= number:
+        powers.append(powers[-1] ** 2)
+
+    total = 0
+    stack = [(number, len(powers) - 1)]
+    while stack:
+        value, level = stack.pop()
+        if value < base:
+            total += value
+        elif level == 0:
+            high, low = divmod(value, base)
+            total += high + low
+        else:
+            high, low = divmod(value, powers[level])
+            stack.append((high, level - 1))
+            stack.append((low, level - 1))
+    return total
+
+
+# Masses of up to this many bits walk the fuel stages in
+# fuel_counter_upper_exact, larger ones use the closed form. Measured with
+# benchmark.py, the closed form overtakes walking the stages at about 700
+# bits (1e210).
+EXACT_STAGES_BITS = 700
+
+
+def _fuel_counter_upper_closed(n):
+    '''
+    Closed form of the recursive fuel for the mass n - 3, see
+    fuel_counter_upper_exact.
+    '''
+    # Number of stages needing fuel, ie the largest k with 3**k <= n // 4
+    limit = n // 4
+    if limit < 3:
+        return 0
+    stages = max((limit.bit_length() - 1) * 1000 // 1585 - 1, 1)
+    power = 3 ** stages
+    while power * 3 <= limit:
+        power *= 3
+        stages += 1
+
+    # Remove the floors of the stages past the last one needing fuel
+    quotient = n // (power * 3)
+    tail = quotient + quotient // 3
+
+    floors = (n - _digit_sum(n)) // 2 - tail
+    return floors - 3 * stages
 
 
-def fuel_counter_upper_summation(masses, recursive=False):
+def fuel_counter_upper_exact(mass):
+    '''
+    Determine fuel required for a module given its mass, including the
+    additional fuel's mass, exactly for arbitrarily large integer masses.
+
+    Each fuel stage is floor(m / 3) - 2 = (m + 3) // 3 - 3, so the k-th
+    stage is (mass + 3) // 3**k - 3. Summing the floors over all k gives
+    (n - digit_sum_3(n)) / 2 for n = mass + 3, which is then corrected
+    for the stages that would need no fuel. No recursion or per-stage
+    loop is needed.
+
+
+    :param mass: Mass of the module to calculate fuel for
+    :type mass: int
+    :return: The fuel requirement for the input mass and its fuel.
+    :rtype: int
+    '''
+    n = int(mass) + 3
+
+    if n.bit_length() > EXACT_STAGES_BITS:
+        return _fuel_counter_upper_closed(n)
+
+    # Walking the stages is quicker for smaller masses
+    total_fuel = 0
+    fuel = n // 3 - 3
+    while fuel > 0:
+        total_fuel += fuel
+        fuel = fuel // 3 - 2
+    return total_fuel
+
+
+def build_fuel_table(threshold):
+    '''
+    Precompute the recursive fuel requirement for every integer mass
+    below a threshold. Since the fuel for a mass is always smaller than
+    the mass, each entry is built from an earlier one.
+
+
+    :param threshold: Masses below this value are added to the table
+    :type threshold: int
+    :return: Table where table[mass] is the recursive fuel for mass
+    :rtype: list[int]
+    '''
+    table = [0] * threshold
+    for mass in range(threshold):
+        fuel = mass // 3 - 2
+        if fuel > 0:
+            table[mass] = fuel + table[fuel]
+    return table
+
+
+def fuel_counter_upper_summation(masses, recursive=False, table_threshold=0):
     '''
     Determine fuel required for a module given its mass. Specifically,
     will divide mass by 3, round down, and subtract by 2.
@@ -54,12 +188,22 @@ def fuel_counter_upper_summation(masses, recursive=False):
     :param recursive: Boolean flag to run recursive version
                       for accounting for additional fuel's mass.
     :type recursive: bool
+    :param table_threshold: For the recursive version, precompute a lookup
+                            table for integer masses below this value
+                            (default=0 for no table)
+    :type table_threshold: int
     :return: The fuel requirement for the input mass.
     :rtype: float
     '''
+    table = []
+    if recursive and table_threshold > 0:
+        table = build_fuel_table(table_threshold)
+
     output = []
     for mass in masses:
-        if recursive:
+        if recursive and 0 <= mass < len(table) and mass == int(mass):
+            fuel = table[int(mass)]
+        elif recursive:
             fuel = fuel_counter_upper_recursive(mass)
         else:
             fuel = fuel_counter_upper(mass)
@@ -69,6 +213,170 @@ def fuel_counter_upper_summation(masses, recursive=False):
     return sum(output)
 
 
+def _fuel_counter_upper_batch_python(masses, recursive=False):
+    '''
+    Pure Python fallback for fuel_counter_upper_batch using integer
+    arithmetic when NumPy is not available.
+    '''
+    total_fuel = 0
+    for mass in masses:
+        fuel = int(mass) // 3 - 2
+        while fuel > 0:
+            total_fuel += fuel
+            if not recursive:
+                break
+            fuel = fuel // 3 - 2
+    return total_fuel
+
+
+def fuel_counter_upper_batch(masses, recursive=False):
+    '''
+    Determine total fuel required for a batch of modules given their
+    masses, using vectorized integer arithmetic over the whole batch.
+    For the recursive version, the divide by 3 and subtract by 2 step
+    is applied to the whole array until no fuel is left.
+
+
+    :param masses: Masses of the modules to calculate fuel for
+    :type masses: numpy.ndarray, buffer or list[int]
+    :param recursive: Boolean flag to run recursive version
+                      for accounting for additional fuel's mass.
+    :type recursive: bool
+    :return: The total fuel requirement for the input masses.
+    :rtype: int
+    '''
+    if numpy is None:
+        return _fuel_counter_upper_batch_python(masses, recursive=recursive)
+
+    fuel = numpy.asarray(masses).astype(numpy.int64) // 3 - 2
+    fuel = fuel[fuel > 0]
+    total_fuel = int(fuel.sum())
+
+    # Only keep the masses that still need fuel on each pass
+    while recursive and fuel.size:
+        fuel //= 3
+        fuel -= 2
+        fuel = fuel[fuel > 0]
+        total_fuel += int(fuel.sum())
+
+    return total_fuel
+
+
+# Number of bytes of a mass manifest parsed at a time when streaming
+MANIFEST_CHUNK_SIZE = 2 ** 22
+
+
+def iter_mass_chunks(stream, chunk_size=MANIFEST_CHUNK_SIZE, limit=None):
+    '''
+    Read whitespace separated integer masses from a binary stream in large
+    chunks, yielding the masses parsed from each chunk as a list.
+
+
+    :param stream: Binary file object (or mmap) to read masses from
+    :type stream: file
+    :param chunk_size: Number of bytes to read at a time
+    :type chunk_size: int
+    :param limit: Maximum number of bytes to read (default=None to read
+                  to the end of the stream)
+    :type limit: int
+    :return: Generator of lists of masses
+    '''
+    remainder = b''
+    while limit is None or limit > 0:
+        size = chunk_size if limit is None else min(chunk_size, limit)
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        if limit is not None:
+            limit -= len(chunk)
+
+        # Keep a partial mass at the end of the chunk for the next one
+        tokens = (remainder + chunk).split()
+        remainder = b''
+        if tokens and not chunk[-1:].isspace():
+            remainder = tokens.pop()
+        yield [int(token) for token in tokens]
+
+    if remainder:
+        yield [int(remainder)]
+
+
+def _next_line(mapped, offset):
+    '''
+    Move an offset in a mapped file forward to the start of a line
+    '''
+    if offset == 0:
+        return 0
+    newline = mapped.find(b'\n', offset - 1)
+    if newline < 0:
+        return len(mapped)
+    return newline + 1
+
+
+def _fuel_counter_upper_file_range(path, start, stop, recursive=False,
+                                   chunk_size=MANIFEST_CHUNK_SIZE):
+    '''
+    Determine the total fuel for the masses on lines starting between the
+    start and stop byte offsets of a manifest file.
+    '''
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            begin = _next_line(mapped, start)
+            end = _next_line(mapped, stop)
+            mapped.seek(begin)
+
+            total_fuel = 0
+            for masses in iter_mass_chunks(mapped, chunk_size, end - begin):
+                total_fuel += fuel_counter_upper_batch(masses, recursive)
+            return total_fuel
+        finally:
+            mapped.close()
+
+
+def fuel_counter_upper_file(path, recursive=False, workers=None,
+                            chunk_size=MANIFEST_CHUNK_SIZE):
+    '''
+    Determine total fuel required for a manifest file of integer masses,
+    one per line, without loading the whole file. The file is split into
+    byte ranges that are memory-mapped and summed in separate processes.
+
+
+    :param path: Path to the manifest file
+    :type path: str
+    :param recursive: Boolean flag to run recursive version
+                      for accounting for additional fuel's mass.
+    :type recursive: bool
+    :param workers: Number of processes to use (default=None for the
+                    number of CPUs)
+    :type workers: int
+    :param chunk_size: Number of bytes parsed at a time in each process
+    :type chunk_size: int
+    :return: The total fuel requirement for the manifest.
+    :rtype: int
+    '''
+    size = os.path.getsize(path)
+    workers = workers or os.cpu_count() or 1
+
+    step = size // workers + 1
+    ranges = [(start, min(start + step, size))
+              for start in range(0, size, step)]
+
+    if workers == 1 or len(ranges) <= 1:
+        return sum(_fuel_counter_upper_file_range(
+            path, start, stop, recursive, chunk_size)
+            for start, stop in ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fuel_counter_upper_file_range,
+                                   path, start, stop, recursive, chunk_size)
+                   for start, stop in ranges]
+        return sum(future.result() for future in futures)
+
+
 if __name__ == "__main__":
     # Parse CLI arguements
     parser = argparse.ArgumentParser()
@@ -77,13 +385,14 @@ if __name__ == "__main__":
     parser.add_argument("--part", type=int, default=1,
                         choices=[1, 2],
                         help="Either sovling part 1 or part 2 of problem")
+    parser.add_argument("--batch", action="store_true",
+                        help="Use the vectorized batch fuel counter")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the input file across processes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes used with --stream")
     args = parser.parse_args()
 
-    # Read in input file with list of masses and parse
-    with open(args.input_file, 'r') as f:
-        contents = f.readlines()
-    masses = [float(x.strip()) for x in contents]
-
     # Determine if we are solving Part I or Part II of the problem
     if args.part == 1:
         recursive = False
@@ -91,5 +400,17 @@ if __name__ == "__main__":
         recursive = True
 
     # Calculate and output solution to problem
-    fuel = fuel_counter_upper_summation(masses, recursive=recursive)
+    if args.stream:
+        fuel = fuel_counter_upper_file(args.input_file, recursive=recursive,
+                                       workers=args.workers)
+    else:
+        # Read in input file with list of masses and parse
+        with open(args.input_file, 'r') as f:
+            contents = f.readlines()
+        masses = [float(x.strip()) for x in contents]
+
+        if args.batch:
+            fuel = fuel_counter_upper_batch(masses, recursive=recursive)
+        else:
+            fuel = fuel_counter_upper_summation(masses, recursive=recursive)
     print("Total fuel required: {}".format(fuel))
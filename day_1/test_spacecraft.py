@@ -1,6 +1,21 @@
+import io
+
+import pytest
+
 import spacecraft
 
 
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    ''' Run a test with NumPy and with the pure Python fallback '''
+    if request.param == "numpy":
+        if spacecraft.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(spacecraft, "numpy", None)
+    return request.param
+
+
 def test_fuel_counter_upper():
     ''' Test for the basic fuel counter '''
     assert spacecraft.fuel_counter_upper(-2) == 0
@@ -31,3 +46,99 @@ def test_fuel_counter_upper_summation_recursive():
     target = 2 + 2 + 966 + 50346
     assert spacecraft.fuel_counter_upper_summation(
         masses, recursive=True) == target
+
+
+def test_fuel_counter_upper_batch(backend):
+    ''' Test the batch version of fuel counter matches the scalar one '''
+    masses = [-2, 0, 12, 14, 1969, 100756]
+    target = spacecraft.fuel_counter_upper_summation(masses)
+    assert spacecraft.fuel_counter_upper_batch(masses) == target
+
+    target = spacecraft.fuel_counter_upper_summation(masses, recursive=True)
+    assert spacecraft.fuel_counter_upper_batch(
+        masses, recursive=True) == target
+
+
+def test_fuel_counter_upper_batch_python():
+    ''' Test the pure Python fallback of the batch fuel counter '''
+    masses = [12, 14, 1969, 100756]
+    assert spacecraft._fuel_counter_upper_batch_python(
+        masses) == 2 + 2 + 654 + 33583
+    assert spacecraft._fuel_counter_upper_batch_python(
+        masses, recursive=True) == 2 + 2 + 966 + 50346
+
+
+def test_fuel_counter_upper_recursive_total_fuel():
+    ''' Test the recursive fuel counter adds onto a running total '''
+    assert spacecraft.fuel_counter_upper_recursive(12, total_fuel=3) == 5
+    assert spacecraft.fuel_counter_upper_recursive(1969, total_fuel=34) == 1000
+
+
+def test_build_fuel_table():
+    ''' Test the lookup table matches the recursive fuel counter '''
+    table = spacecraft.build_fuel_table(2000)
+    assert len(table) == 2000
+    assert table[14] == 2
+    assert table[1969] == 966
+    for mass in range(2000):
+        assert table[mass] == spacecraft.fuel_counter_upper_recursive(mass)
+
+
+def test_fuel_counter_upper_summation_table():
+    ''' Test the summation version of fuel counter with a lookup table '''
+    masses = [12, 14, 1969, 100756, 12.5]
+    target = spacecraft.fuel_counter_upper_summation(masses, recursive=True)
+    assert spacecraft.fuel_counter_upper_summation(
+        masses, recursive=True, table_threshold=2000) == target
+
+
+def test_fuel_counter_upper_exact():
+    ''' Test the exact fuel counter against the recursive one '''
+    for mass in [-2, 0, 8, 9, 12, 14, 1969, 100756]:
+        assert spacecraft.fuel_counter_upper_exact(mass) == \
+            spacecraft.fuel_counter_upper_recursive(mass)
+
+    # Beyond float precision and the recursion limit
+    mass = 10 ** 1000 + 7
+    total_fuel = 0
+    fuel = mass // 3 - 2
+    while fuel > 0:
+        total_fuel += fuel
+        fuel = fuel // 3 - 2
+    assert spacecraft.fuel_counter_upper_exact(mass) == total_fuel
+
+
+def test_fuel_counter_upper_integer_precision():
+    ''' Test the basic fuel counter is exact for large integers '''
+    mass = 2 ** 60 + 1
+    assert spacecraft.fuel_counter_upper(mass) == mass // 3 - 2
+
+
+def test_iter_mass_chunks():
+    ''' Test masses are parsed across chunk boundaries '''
+    stream = io.BytesIO(b"12\n14\n1969\n100756\n")
+    chunks = list(spacecraft.iter_mass_chunks(stream, chunk_size=4))
+    assert sum(chunks, []) == [12, 14, 1969, 100756]
+
+    stream = io.BytesIO(b"12\n14\n1969")
+    chunks = list(spacecraft.iter_mass_chunks(stream, chunk_size=3, limit=6))
+    assert sum(chunks, []) == [12, 14]
+
+
+def test_fuel_counter_upper_file(tmpdir):
+    ''' Test the streaming fuel counter over a manifest file '''
+    masses = [12, 14, 1969, 100756] * 50
+    path = tmpdir.join("manifest")
+    path.write("\n".join(str(mass) for mass in masses) + "\n")
+
+    target = spacecraft.fuel_counter_upper_summation(masses)
+    assert spacecraft.fuel_counter_upper_file(
+        str(path), workers=1, chunk_size=7) == target
+
+    target = spacecraft.fuel_counter_upper_summation(masses, recursive=True)
+    assert spacecraft.fuel_counter_upper_file(
+        str(path), recursive=True, workers=3, chunk_size=7) == target
+
+    path = tmpdir.join("empty")
+    path.write("")
+    assert spacecraft.fuel_counter_upper_file(str(path)) == 0
@@ -0,0 +1,133 @@
+import argparse
+import timeit
+
+from intcode import IntCode, Profiler, load_program
+
+
+def run_commands_stride(intcode):
+    '''
+    Reference engine that steps through memory with a fixed stride of 4,
+    as the fast engine did before it moved to an instruction pointer with
+    a width per opcode. Kept to time the pointer based engine against.
+    '''
+    memory = intcode._memory
+    operations = IntCode.OPERATIONS
+    halt = IntCode.HALT
+    dirty = intcode._dirty
+    for start in range(0, intcode._number_of_commands * 4, 4):
+        instruction = memory[start]
+        operation = operations.get(instruction)
+        if operation is not None:
+            output_position = memory[start + 3]
+            memory[output_position] = operation(
+                memory[memory[start + 1]], memory[memory[start + 2]])
+            if dirty is not None:
+                dirty.add(output_position)
+        elif instruction == halt:
+            return intcode._output()
+        else:
+            raise IntCode._unknown_instruction(instruction)
+
+
+def count_instructions(code):
+    ''' Count the instructions executed by a program up to and including
+    the halt command
+    :param code: Program to count the instructions for
+    :type code: list[int]
+    :return: Number of instructions executed
+    :rtype: int
+    '''
+    intcode = IntCode(code)
+    intcode.profiler = Profiler()
+    intcode.run_commands()
+    return intcode.profiler.instruction_count
+
+
+def engine_timer(code, method, number):
+    ''' Timer for a number of runs of an engine, each from the same memory
+    :param code: Program to run
+    :type code: list[int]
+    :param method: Name of the IntCode method that runs the commands, or
+                   a function taking the IntCode object
+    :type method: str or function
+    :param number: Number of runs per timing
+    :type number: int
+    :return: Function timing the runs, in seconds for a single run
+    :rtype: function
+    '''
+    intcode = IntCode(code)
+    intcode.snapshot()
+
+    # Time the engines alone rather than building the output string
+    intcode._output = lambda: None
+    if callable(method):
+        engine = lambda: method(intcode)
+    else:
+        engine = getattr(intcode, method)
+
+    def run():
+        intcode.restore()
+        engine()
+
+    timer = timeit.Timer(run)
+    return lambda: timer.timeit(number) / number
+
+
+def benchmark_engines(code, engines, number, repeat):
+    ''' Best time in seconds of a single run of each engine. The engines
+    take turns on each repeat, so load on the machine hits them alike.
+    :param code: Program to run
+    :type code: list[int]
+    :param engines: Name and method of each engine, see engine_timer
+    :type engines: list[tuple(str, str or function)]
+    :param number: Number of runs per timing
+    :type number: int
+    :param repeat: Number of timings per engine
+    :type repeat: int
+    :return: Best time for a single run by engine name
+    :rtype: dict
+    '''
+    timers = [(name, engine_timer(code, method, number))
+              for name, method in engines]
+    best = {}
+    for _ in range(repeat):
+        for name, timer in timers:
+            seconds = timer()
+            best[name] = min(best.get(name, seconds), seconds)
+    return best
+
+
+if __name__ == "__main__":
+    # Parse CLI arguements
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_file", type=str,
+                        help="Input file with list of instructions.")
+    parser.add_argument("--number", type=int, default=1000,
+                        help="Number of runs per timing")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="Number of timings per engine")
+    args = parser.parse_args()
+
+    code = list(load_program(args.input_file))
+    code[1] = 12
+    code[2] = 2
+
+    instructions = count_instructions(code)
+    engines = [
+        ("generic", "_run_commands_generic"),
+        ("stride", run_commands_stride),
+        ("fast", "_run_commands_fast"),
+        ("compiled", "run_compiled"),
+    ]
+
+    print("Instructions per run: {}".format(instructions))
+    times = benchmark_engines(code, engines, args.number, args.repeat)
+    for name, _ in engines:
+        seconds = times[name]
+        msg = "{:>10}: {:10.3e} s/run {:12.0f} instructions/s"
+        print(msg.format(name, seconds, instructions / seconds))
+
+    # The pointer engine must keep up with the fixed stride loop it replaced
+    if times["fast"] > times["stride"]:
+        msg = "fast engine is {:.1%} slower than the stride engine"
+        raise SystemExit(msg.format(times["fast"] / times["stride"] - 1))
@@ -1,12 +1,234 @@
 import argparse
+import itertools
 import operator
-from functools import reduce
+import os
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, reduce
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class UnknownInstruction(Exception):
     ''' Raise if we come accross an unknown INSTRUCTION '''
 
 
+class NoSnapshot(Exception):
+    ''' Raise if memory is restored before a snapshot is taken '''
+
+
+class UnknownMemoryBackend(Exception):
+    ''' Raise if we come accross an unknown memory BACKEND '''
+
+
+class InvalidOperation(Exception):
+    ''' Raise if an arithmetic INSTRUCTION is not a binary command '''
+
+
+class ProgramImage(tuple):
+    ''' Immutable program parsed once into Python ints. IntCode objects
+    built from an image copy it into memory without converting the values
+    again, and one image can be shared by any number of them.
+    '''
+
+    @classmethod
+    def parse(cls, contents):
+        ''' Parse a comma-separated program into an image
+        :param contents: Comma-separated list of instructions
+        :type contents: str
+        :return: Parsed program
+        :rtype: ProgramImage
+        '''
+        return cls(map(int, contents.split(',')))
+
+
+# Program images loaded from files, keyed by path, size and modify time
+_PROGRAM_IMAGES = {}
+
+
+def load_program(path):
+    ''' Load the program on the first line of a file into a ProgramImage.
+    Images are cached, so later loads of an unchanged file are free.
+    :param path: Path of the input file with the program
+    :type path: str
+    :return: Parsed program
+    :rtype: ProgramImage
+    '''
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    image = _PROGRAM_IMAGES.get(key)
+    if image is None:
+        with open(path, 'r') as f:
+            image = ProgramImage.parse(f.readline())
+        _PROGRAM_IMAGES[key] = image
+    return image
+
+
+class MemoryDump:
+    ''' Lazy comma-separated view of IntCode memory. The string is only
+    built when asked for, and can be streamed in chunks instead.
+    '''
+
+    def __init__(self, memory, chunk_size=4096):
+        ''' Initialize a MemoryDump over memory
+        :param memory: IntCode memory to dump
+        :type memory: list[int] or array('q')
+        :param chunk_size: Number of cells per streamed chunk
+        :type chunk_size: int
+        '''
+        self._memory = memory
+        self._chunk_size = chunk_size
+
+    def __iter__(self):
+        ''' Iterate over the dump in chunks of comma-separated cells '''
+        memory = self._memory
+        for start in range(0, len(memory), self._chunk_size):
+            chunk = ",".join(map(str, memory[start:start + self._chunk_size]))
+            yield chunk if start == 0 else "," + chunk
+
+    def __str__(self):
+        return "".join(self)
+
+    def __repr__(self):
+        return "MemoryDump({!r})".format(str(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (str, MemoryDump)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def write(self, stream):
+        ''' Write the dump to a stream one chunk at a time
+        :param stream: Text stream to write to
+        :type stream: file
+        '''
+        for chunk in self:
+            stream.write(chunk)
+
+
+class Profiler:
+    ''' Instruction-level profiler and tracer for IntCode runs. Counts
+    instructions per opcode, accesses per memory address, total
+    instructions and wall time per run, and optionally keeps a ring
+    buffer of the most recent commands.
+    '''
+
+    def __init__(self, trace_size=0):
+        ''' Initialize a Profiler
+        :param trace_size: Number of recent commands kept in the trace
+                           (default: 0 for no trace)
+        :type trace_size: int
+        '''
+        self._opcode_counts = Counter()
+        self._address_counts = Counter()
+        self._run_times = []
+        self._trace = deque(maxlen=trace_size) if trace_size else None
+        self._run_start = None
+
+    def begin_run(self):
+        ''' Mark the start of a run '''
+        self._run_start = time.perf_counter()
+
+    def end_run(self):
+        ''' Mark the end of a run and record its wall time '''
+        self._run_times.append(time.perf_counter() - self._run_start)
+        self._run_start = None
+
+    def record(self, position, command):
+        ''' Record a command about to be executed
+        :param position: Position of the command in memory
+        :type position: int
+        :param command: The command, ie [instruction, pos1, ..., output]
+        :type command: list[int]
+        '''
+        instruction = command[0]
+        self._opcode_counts[instruction] += 1
+        if instruction != IntCode.HALT:
+            self._address_counts.update(command[1:])
+        if self._trace is not None:
+            self._trace.append((position, tuple(command)))
+
+    @property
+    def opcode_counts(self):
+        ''' Gets the number of instructions executed per opcode '''
+        return self._opcode_counts
+
+    @property
+    def address_counts(self):
+        ''' Gets the number of reads and writes per memory address '''
+        return self._address_counts
+
+    @property
+    def instruction_count(self):
+        ''' Gets the total number of instructions executed '''
+        return sum(self._opcode_counts.values())
+
+    @property
+    def run_times(self):
+        ''' Gets the wall time in seconds of each run '''
+        return self._run_times
+
+    @property
+    def trace(self):
+        ''' Gets the most recent commands as (position, command) '''
+        return list(self._trace) if self._trace is not None else []
+
+    def report(self, top=5):
+        ''' Create a summary of the profile
+        :param top: Number of hottest addresses to include
+        :type top: int
+        :return: Multi-line summary
+        :rtype: str
+        '''
+        lines = ["Runs: {} Instructions: {} Time: {:.6f}s".format(
+            len(self._run_times), self.instruction_count,
+            sum(self._run_times))]
+        for opcode, count in sorted(self._opcode_counts.items()):
+            lines.append("  Opcode {}: {}".format(opcode, count))
+        for address, count in self._address_counts.most_common(top):
+            lines.append("  Address {}: {}".format(address, count))
+        return "\n".join(lines)
+
+
+# Width of every arithmetic INSTRUCTION, ie the opcode followed by two
+# input positions and an output position
+OPERATION_WIDTH = 4
+
+
+def _decode_table(operations, widths):
+    ''' Pair the operation of each INSTRUCTION with its width. Every
+    engine reads the operands of an arithmetic command at fixed offsets,
+    so each one must be a binary command of OPERATION_WIDTH.
+    :param operations: Operation of each INSTRUCTION
+    :type operations: dict
+    :param widths: Width of each INSTRUCTION
+    :type widths: dict
+    :return: Tuple of (operation, width) for each INSTRUCTION
+    :rtype: dict
+    :raises InvalidOperation: If an operation has another width
+    '''
+    for instruction in operations:
+        width = widths.get(instruction)
+        if width != OPERATION_WIDTH:
+            msg = "INSTRUCTION {} has width {}, operations need width {}"
+            raise InvalidOperation(msg.format(instruction, width,
+                                              OPERATION_WIDTH))
+    return {instruction: (operation, widths[instruction])
+            for instruction, operation in operations.items()}
+
+
 class IntCode:
     ''' IntCode class for computing series of Instructions '''
 
@@ -16,19 +238,78 @@ class IntCode:
     HALT = 99
     INSTRUCTION_CHOICES = [str(x) for x in [ADD, MULTIPLY, HALT]]
 
-    def __init__(self, command_list, stride=4):
+    # Dispatch table of the binary operation for each arithmetic INSTRUCTION.
+    # Each one is a 3-address command, ie the opcode followed by two input
+    # positions and an output position, so its width must be 4. Subclasses
+    # add opcodes by extending OPERATIONS and WIDTHS.
+    OPERATIONS = {
+        ADD: operator.add,
+        MULTIPLY: operator.mul,
+    }
+
+    # Width of each INSTRUCTION, ie the opcode followed by its parameters
+    WIDTHS = {
+        ADD: 4,
+        MULTIPLY: 4,
+        HALT: 1,
+    }
+
+    # Operation and width of each arithmetic INSTRUCTION for the fast
+    # engine, rebuilt for subclasses that extend OPERATIONS or WIDTHS
+    DECODE = _decode_table(OPERATIONS, WIDTHS)
+
+    # MEMORY BACKENDS
+    LIST = 'list'
+    ARRAY = 'array'
+    MEMORY_CHOICES = [LIST, ARRAY]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.DECODE = _decode_table(cls.OPERATIONS, cls.WIDTHS)
+
+    def __init__(self, command_list, stride=4, memory=LIST):
         ''' Initialize object of IntCode with instruction command list
         and a stride for the command length (default: 4)
         :param command_list: List of instructions to execute
-        :type command_list: list[int]
+        :type command_list: list[int] or ProgramImage
         :param stride: Length of the commands with structure:
                        [instruction, pos1, pos2, ..., output_position]
         :type stride: int
+        :param memory: Memory backend, either a list of Python ints or an
+                       array of 64-bit ints that switches to a list when
+                       a value does not fit (default: 'list')
+        :type memory: str
         '''
+        if memory not in self.MEMORY_CHOICES:
+            msg = "Unknown memory BACKEND: {} Choices: {}"
+            msg = msg.format(memory, ','.join(self.MEMORY_CHOICES))
+            raise UnknownMemoryBackend(msg)
+
+        # Images are already ints, so only other programs are converted
+        if not isinstance(command_list, ProgramImage):
+            command_list = [int(x) for x in command_list]
+
         self._stride = stride
-        self._memory = [int(x) for x in command_list]
+        self._memory = None
+        if memory == self.ARRAY:
+            try:
+                self._memory = array('q', command_list)
+            except OverflowError:
+                pass
+        if self._memory is None:
+            self._memory = list(command_list)
         self._number_of_commands = int(len(self._memory) / stride) + 1
 
+        # Base image and dirty positions since the last snapshot
+        self._snapshot = None
+        self._dirty = None
+
+        # Function compiled from the program, see IntCode.compile
+        self._compiled = None
+
+        # Optional instrumentation, see IntCode.profiler
+        self._profiler = None
+
     @staticmethod
     def product(value_list):
         ''' Static method used to compute produce of a list of values.
@@ -63,7 +344,7 @@ class IntCode:
         :type output_position: int
         '''
         value_list = self._create_list_from_positions(positions)
-        self._memory[output_position] = sum(value_list)
+        self.write(output_position, sum(value_list))
 
     def _run_multiply(self, positions, output_position):
         ''' Multiply the values together that are at the positions given
@@ -75,38 +356,1136 @@ class IntCode:
         :type output_position: int
         '''
         value_list = self._create_list_from_positions(positions)
-        self._memory[output_position] = self.product(value_list)
+        self.write(output_position, self.product(value_list))
+
+    def _run_operation(self, operation):
+        ''' Build a command runner for an operation from the dispatch
+        table that folds the values at the given positions together
+        :param operation: Operation taking two values
+        :type operation: function
+        :return: Runner taking the positions and the output position
+        :rtype: function
+        '''
+        def run(positions, output_position):
+            value_list = self._create_list_from_positions(positions)
+            self.write(output_position, reduce(operation, value_list))
+        return run
+
+    def write(self, position, value):
+        ''' Write a value to a position in memory, recording the position
+        as dirty if a snapshot has been taken
+        :param position: Position in memory to write to
+        :type position: int
+        :param value: Value to write
+        :type value: int
+        '''
+        try:
+            self._memory[position] = value
+        except OverflowError:
+            self._promote_memory()
+            self._memory[position] = value
+        if self._dirty is not None:
+            self._dirty.add(position)
+
+    def snapshot(self):
+        ''' Take a snapshot of the current memory as an immutable base
+        image. From then on, every position written is journaled so that
+        restore only resets the positions that were actually written.
+        :return: The base image of memory
+        :rtype: tuple(int)
+        '''
+        self._snapshot = tuple(self._memory)
+        self._dirty = set()
+        return self._snapshot
+
+    def restore(self):
+        ''' Restore memory to the last snapshot, only resetting the
+        positions written since the snapshot or the last restore
+        '''
+        if self._snapshot is None:
+            raise NoSnapshot("No snapshot to restore")
+
+        memory = self._memory
+        snapshot = self._snapshot
+        for position in self._dirty:
+            memory[position] = snapshot[position]
+        self._dirty.clear()
 
     def _output(self):
         ''' Return current command list as a comma-separated string '''
-        return ",".join([str(x) for x in self._memory])        
+        return ",".join(map(str, self._memory))
+
+    def dump(self, chunk_size=4096):
+        ''' Lazy comma-separated view of the current memory, for streaming
+        large memories without building the whole string. The view follows
+        later changes to memory, so take it after the run it should show.
+        :param chunk_size: Number of cells per streamed chunk
+        :type chunk_size: int
+        :return: View of the memory
+        :rtype: MemoryDump
+        '''
+        return MemoryDump(self._memory, chunk_size=chunk_size)
+
+    def write_memory(self, stream):
+        ''' Write the current memory to a stream as comma-separated cells,
+        one chunk at a time
+        :param stream: Text stream to write to
+        :type stream: file
+        '''
+        self.dump().write(stream)
+
+    def _promote_memory(self):
+        ''' Switch typed memory to a list of Python ints, used when a
+        value is too large for the typed memory
+        '''
+        self._memory = list(self._memory)
+
+    @classmethod
+    def _unknown_instruction(cls, instruction):
+        ''' Create the exception raised for an unknown instruction
+        :param instruction: The unknown instruction found
+        :type instruction: int
+        :return: Exception to raise
+        :rtype: UnknownInstruction
+        '''
+        msg = "Unknown INSTRUCTION: {} Choices: {}"
+        msg = msg.format(instruction, ','.join(cls.INSTRUCTION_CHOICES))
+        return UnknownInstruction(msg)
+
+    def _run_commands_generic(self, first=0):
+        ''' Run the commands for any stride, where each command has
+        (stride - 2) input positions. Each command is sliced out of memory.
+        :param first: Index of the first command to run (default: 0)
+        :type first: int
+        '''
+        try:
+            for i in range(first, self._number_of_commands):
+                start = i * self._stride
+                stop = start + self._stride
+                command = self._memory[start:stop]
+
+                instruction = command[0]
+                parameters = command[1:-1]
+                output_position = command[-1]
+
+                if instruction == self.ADD:
+                    self._run_add(parameters, output_position)
+
+                elif instruction == self.MULTIPLY:
+                    self._run_multiply(parameters, output_position)
+
+                elif instruction == self.HALT:
+                    return self._output()
+
+                elif instruction in self.OPERATIONS:
+                    run = self._run_operation(self.OPERATIONS[instruction])
+                    run(parameters, output_position)
+
+                else:
+                    raise self._unknown_instruction(instruction)
+
+        except OverflowError:
+            # The failed write left memory untouched, so retry the command
+            self._promote_memory()
+            return self._run_commands_generic(i)
+
+    def _run_commands_fast(self, start=0):
+        ''' Run the commands from an instruction pointer that moves by
+        the width of each instruction. The operation and width are looked
+        up together in the DECODE table, which stops the loop with a
+        KeyError at any other instruction, and the operands are read
+        directly from memory. Runs without a journal skip recording the
+        writes.
+        :param start: Position of the first command to run (default: 0)
+        :type start: int
+        '''
+        memory = self._memory
+        decode = self.DECODE
+        dirty = self._dirty
+
+        pointer = start
+        try:
+            if dirty is None:
+                while True:
+                    operation, width = decode[memory[pointer]]
+                    memory[memory[pointer + 3]] = operation(
+                        memory[memory[pointer + 1]],
+                        memory[memory[pointer + 2]])
+                    pointer += width
+            else:
+                record = dirty.add
+                while True:
+                    operation, width = decode[memory[pointer]]
+                    output_position = memory[pointer + 3]
+                    memory[output_position] = operation(
+                        memory[memory[pointer + 1]],
+                        memory[memory[pointer + 2]])
+                    record(output_position)
+                    pointer += width
+
+        except KeyError:
+            # Not an arithmetic command, either HALT or unknown
+            pass
+
+        except OverflowError:
+            # The failed write left memory untouched, so retry the command
+            self._promote_memory()
+            return self._run_commands_fast(pointer)
+
+        instruction = memory[pointer]
+        if instruction == self.HALT:
+            return self._output()
+        raise self._unknown_instruction(instruction)
+
+    def _command_runner(self, instruction):
+        ''' Gets the runner of an arithmetic INSTRUCTION for the profiled
+        engine, taking the positions and the output position
+        :param instruction: The INSTRUCTION to run
+        :type instruction: int
+        :return: Runner for the INSTRUCTION
+        :rtype: function
+        :raises UnknownInstruction: If the INSTRUCTION has no operation
+        '''
+        if instruction == self.ADD:
+            return self._run_add
+        if instruction == self.MULTIPLY:
+            return self._run_multiply
+        if instruction in self.OPERATIONS:
+            return self._run_operation(self.OPERATIONS[instruction])
+        raise self._unknown_instruction(instruction)
+
+    def _run_commands_profiled(self):
+        ''' Run the commands from an instruction pointer while recording
+        each command with the attached Profiler
+        '''
+        profiler = self._profiler
+        profiler.begin_run()
+        try:
+            pointer = 0
+            while True:
+                # Arithmetic commands take the stride given to IntCode
+                instruction = self._memory[pointer]
+                if instruction in self.OPERATIONS:
+                    width = self._stride
+                else:
+                    width = self.WIDTHS.get(instruction, 1)
+                command = self._memory[pointer:pointer + width]
+                profiler.record(pointer, command)
+
+                if instruction == self.HALT:
+                    return self._output()
+
+                run = self._command_runner(instruction)
+                if len(command) < width:
+                    raise IndexError("list index out of range")
+
+                try:
+                    run(command[1:-1], command[-1])
+                except OverflowError:
+                    self._promote_memory()
+                    run(command[1:-1], command[-1])
+                pointer += width
+        finally:
+            profiler.end_run()
 
     def run_commands(self):
         ''' Run the commands input into IntCode object and return
         the output upon reaching the halt command
         '''
-        for i in range(self._number_of_commands):
-            start = i * self._stride
-            stop = start + self._stride
-            command = self._memory[start:stop]
+        if self._profiler is not None:
+            return self._run_commands_profiled()
+        if self._stride == 4:
+            return self._run_commands_fast()
+        return self._run_commands_generic()
+
+    @property
+    def profiler(self):
+        ''' Gets the Profiler attached to the IntCode object, if any '''
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, profiler):
+        ''' Attach a Profiler to record runs, or None to detach. While a
+        Profiler is attached, runs use the instrumented interpreter.
+        '''
+        self._profiler = profiler
+
+    def compile(self):
+        ''' Compile the current memory into a Python function, see
+        compile_program. Later runs with run_compiled reuse the function
+        even if the inputs in memory are changed.
+        '''
+        journal = self._dirty is not None
+        self._compiled = compile_program(self._memory, journal=journal,
+                                         intcode_class=type(self))
+        return self._compiled
+
+    def run_compiled(self):
+        ''' Run the commands with the compiled function for the program
+        and return the output upon reaching the halt command. Where the
+        memory no longer matches the compiled instructions, the remaining
+        commands are run by the interpreter.
+        '''
+        self._run_compiled_commands()
+        return self._output()
+
+    def _run_compiled_commands(self):
+        ''' Run the commands as run_compiled does, without building the
+        output, for callers that only read memory afterwards
+        '''
+        if self._stride != 4 or self._profiler is not None:
+            self.run_commands()
+            return
+
+        journal = self._dirty is not None
+        if self._compiled is None or self._compiled.journal != journal:
+            self.compile()
+
+        try:
+            resume = self._compiled(self._memory, self._dirty)
+        except CompiledOverflow as overflow:
+            # The failed write left memory untouched, so retry the command
+            self._promote_memory()
+            resume = overflow.position
+        if resume != COMPILED_HALT:
+            self._run_commands_fast(resume)
+
+
+# Returned by a compiled program when it reaches the halt command
+COMPILED_HALT = -1
+
+
+class CompiledOverflow(Exception):
+    ''' Raise if a compiled program writes a value too large for memory '''
+
+    def __init__(self, position):
+        super().__init__("Value too large at command {}".format(position))
+        self.position = position
+
+
+# Number of compiled programs kept, see compile_program
+COMPILED_CACHE_SIZE = 128
+
+
+def _program_layout(program, intcode_class=IntCode):
+    ''' Follow the instruction widths from the start of a program the way
+    the compiler does and collect the commands it compiles
+    :param program: Program to follow
+    :type program: list[int]
+    :param intcode_class: IntCode class with the instruction tables
+    :type intcode_class: type
+    :return: Tuple of (position, instruction) for each compiled command
+    :rtype: tuple(tuple(int, int))
+    '''
+    layout = []
+    start = 0
+    while start < len(program):
+        instruction = program[start]
+        layout.append((start, instruction))
+        if instruction not in intcode_class.OPERATIONS:
+            break
+        start += intcode_class.WIDTHS[instruction]
+    return tuple(layout)
+
+
+# Operations compiled to a Python operator rather than a call
+_OPERATION_SYMBOLS = {operator.add: "+", operator.mul: "*"}
+
+
+def _generate_program_source(layout, length, journal=False,
+                             intcode_class=IntCode):
+    ''' Generate the source of a straight-line Python function for the
+    commands of a program layout, see _program_layout. Each command checks
+    its instruction is unchanged, and otherwise returns its position so the
+    interpreter can take over (and raise UnknownInstruction where it would
+    have). Operands are read from memory when the function runs. Operations
+    without an operator are called from the operations table.
+    '''
+    operations = intcode_class.OPERATIONS
+    body = []
+    start = 0
+    for start, instruction in layout:
+        body.append("p = {}".format(start))
+        body.append("if m[{0}] != {1}: return {0}".format(start, instruction))
 
-            instruction = command[0]
-            parameters = command[1:-1]
-            output_position = command[-1]
+        if instruction == intcode_class.HALT:
+            body.append("return {}".format(COMPILED_HALT))
+            break
 
-            if instruction == self.ADD:
-                self._run_add(parameters, output_position)
+        width = intcode_class.WIDTHS.get(instruction, 1)
+        if instruction not in operations or start + width > length:
+            body.append("return {}".format(start))
+            break
 
-            elif instruction == self.MULTIPLY:
-                self._run_multiply(parameters, output_position)
+        body.append("a = m[{}]".format(start + 3))
+        symbol = _OPERATION_SYMBOLS.get(operations[instruction])
+        if symbol is None:
+            body.append("m[a] = operations[{}](m[m[{}]], m[m[{}]])".format(
+                instruction, start + 1, start + 2))
+        else:
+            body.append("m[a] = m[m[{}]] {} m[m[{}]]".format(
+                start + 1, symbol, start + 2))
+        if journal:
+            body.append("dirty.add(a)")
+        start += width
+    else:
+        # Let the interpreter run the rest of the commands
+        body.append("return {}".format(start))
 
-            elif instruction == self.HALT:
-                return self._output()
+    # Report the command that overflowed typed memory
+    lines = ["def run(m, dirty):", "    p = 0", "    try:"]
+    lines.extend("        " + line for line in body)
+    lines.append("    except OverflowError:")
+    lines.append("        raise CompiledOverflow(p)")
+    return "\n".join(lines)
 
+
+@lru_cache(maxsize=COMPILED_CACHE_SIZE)
+def _compile_layout(layout, length, journal, intcode_class):
+    ''' Compile the function for a program layout, see compile_program '''
+    source = _generate_program_source(layout, length, journal, intcode_class)
+    namespace = {"CompiledOverflow": CompiledOverflow,
+                 "operations": intcode_class.OPERATIONS}
+    filename = "<intcode-{:x}>".format(hash(layout) & 0xffffffff)
+    exec(compile(source, filename, "exec"), namespace)
+    function = namespace["run"]
+    function.journal = journal
+    return function
+
+
+def compile_program(program, journal=False, intcode_class=IntCode):
+    ''' Compile a program into a Python function run(memory, dirty)
+    that executes the commands as straight-line code and returns
+    COMPILED_HALT, or the position where the interpreter should continue.
+    Functions are cached by the instructions the compiler follows and the
+    length of the program, so programs that only differ in their inputs
+    share a function.
+    :param program: Program to compile
+    :type program: list[int]
+    :param journal: Record written positions in the dirty set passed to
+                    the function, see IntCode.snapshot
+    :type journal: bool
+    :param intcode_class: IntCode class with the instruction tables
+                          (default: IntCode)
+    :type intcode_class: type
+    :return: Compiled function, with a journal attribute
+    :rtype: function
+    '''
+    layout = _program_layout(program, intcode_class)
+    return _compile_layout(layout, len(program), journal, intcode_class)
+
+
+def _search_inputs_chunk(code, target, ranges, positions, output_position,
+                         intcode_class=IntCode):
+    ''' Search every combination of inputs from the ranges in order and
+    return the first one producing the target, or None if none do
+    '''
+    intcode = intcode_class(code)
+    intcode.snapshot()
+    for inputs in itertools.product(*ranges):
+        intcode.restore()
+        for position, value in zip(positions, inputs):
+            intcode.write(position, value)
+
+        try:
+            intcode._run_compiled_commands()
+        except (UnknownInstruction, IndexError):
+            # These inputs do not give a valid program
+            continue
+
+        if intcode._memory[output_position] == target:
+            return inputs
+    return None
+
+
+def search_inputs(code, target, ranges=(range(100), range(100)),
+                  positions=(1, 2), output_position=0, workers=None,
+                  chunk_size=None, intcode_class=IntCode):
+    ''' Search for the inputs that make a program produce a target value.
+    The first range is split into chunks that are searched in a process
+    pool, and the search stops at the first chunk with a hit.
+    :param code: Program to search the inputs for
+    :type code: list[int]
+    :param target: Value wanted at the output position after halting
+    :type target: int
+    :param ranges: Range of values to try for each input
+                   (default: nouns and verbs in 0-99)
+    :type ranges: list[range]
+    :param positions: Positions in memory to place the inputs
+    :type positions: list[int]
+    :param output_position: Position in memory with the output
+    :type output_position: int
+    :param workers: Number of processes (default: None for number of CPUs)
+    :type workers: int
+    :param chunk_size: Number of values from the first range per task
+                       (default: None to split the range evenly per worker)
+    :type chunk_size: int
+    :param intcode_class: IntCode class to run the program with
+                          (default: IntCode)
+    :type intcode_class: type
+    :return: First inputs (in order of the ranges) that give the target,
+             or None if there are none
+    :rtype: tuple(int)
+    '''
+    workers = workers or os.cpu_count() or 1
+    first, rest = ranges[0], list(ranges[1:])
+    if not chunk_size:
+        chunk_size = max(len(first) // (workers * 4), 1)
+    chunks = [first[i:i + chunk_size] for i in range(0, len(first), chunk_size)]
+
+    if workers == 1:
+        for chunk in chunks:
+            hit = _search_inputs_chunk(code, target, [chunk] + rest,
+                                       positions, output_position,
+                                       intcode_class)
+            if hit is not None:
+                return hit
+        return None
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_search_inputs_chunk, code, target,
+                                   [chunk] + rest, positions, output_position,
+                                   intcode_class)
+                   for chunk in chunks]
+        for future in futures:
+            hit = future.result()
+            if hit is not None:
+                for pending in futures:
+                    pending.cancel()
+                return hit
+    return None
+
+
+class BatchIntCode:
+    ''' Batch of IntCode memories running the same program in lockstep.
+    With NumPy the memories are the rows of a 2-D array and each command
+    runs for every row at once, with the rows split by opcode when they
+    disagree. Without NumPy the rows are lists run one command at a time.
+    '''
+
+    # Largest magnitude of a 64-bit signed integer
+    INT64_LIMIT = 2 ** 63
+
+    def __init__(self, command_list, size, intcode_class=IntCode):
+        ''' Initialize a batch of IntCode memories from one program
+        :param command_list: List of instructions to execute
+        :type command_list: list[int] or ProgramImage
+        :param size: Number of memories in the batch
+        :type size: int
+        :param intcode_class: IntCode class with the instruction tables
+                              (default: IntCode)
+        :type intcode_class: type
+        '''
+        self._intcode_class = intcode_class
+        if isinstance(command_list, ProgramImage):
+            code = command_list
+        else:
+            code = [int(x) for x in command_list]
+        self._size = size
+        self._length = len(code)
+
+        if numpy is not None:
+            try:
+                row = numpy.array(code, dtype=numpy.int64)
+            except OverflowError:
+                row = numpy.array(code, dtype=object)
+            self._memory = numpy.tile(row, (size, 1))
+        else:
+            self._memory = [list(code) for _ in range(size)]
+
+        self._halted = [False] * size
+        self._errors = {}
+        # Largest magnitude in memory, kept while a NumPy run is going on
+        self._bound = 0
+
+    def write(self, position, values):
+        ''' Write a value per memory to a position in every memory
+        :param position: Position in memory to write to
+        :type position: int
+        :param values: Value for each memory in the batch
+        :type values: list[int]
+        '''
+        if numpy is not None:
+            values = list(values)
+            try:
+                self._memory[:, position] = values
+            except OverflowError:
+                self._memory = self._memory.astype(object)
+                self._memory[:, position] = values
+        else:
+            for row, value in zip(self._memory, values):
+                row[position] = value
+
+    def read(self, position):
+        ''' Read a position from every memory
+        :param position: Position in memory to read
+        :type position: int
+        :return: Value for each memory in the batch
+        :rtype: list[int]
+        '''
+        if numpy is not None:
+            return [int(x) for x in self._memory[:, position]]
+        return [row[position] for row in self._memory]
+
+    @property
+    def memory(self):
+        ''' Gets the memories of the batch, one row per memory '''
+        return self._memory
+
+    @property
+    def halted(self):
+        ''' Gets whether each memory reached the halt command '''
+        return self._halted
+
+    @property
+    def errors(self):
+        ''' Gets the exception for each memory that failed, by row '''
+        return self._errors
+
+    def _fail(self, rows, error):
+        ''' Record an error for rows of the batch '''
+        for row in rows:
+            self._errors[int(row)] = error
+
+    def run_commands(self):
+        ''' Run the commands for every memory until each one halts, fails
+        or runs out of commands
+        '''
+        if numpy is not None:
+            self._run_commands_numpy()
+        else:
+            self._run_commands_python()
+
+    def _run_commands_python(self):
+        ''' Run the commands row by row, one command at a time, with an
+        instruction pointer for each row
+        '''
+        intcode_class = self._intcode_class
+        running = [(i, 0) for i in range(self._size)]
+        while running:
+            still_running = []
+            for i, start in running:
+                memory = self._memory[i]
+                try:
+                    instruction = memory[start]
+                    if instruction == intcode_class.HALT:
+                        self._halted[i] = True
+                        continue
+                    operation = intcode_class.OPERATIONS.get(instruction)
+                    if operation is None:
+                        raise intcode_class._unknown_instruction(instruction)
+                    memory[memory[start + 3]] = operation(
+                        memory[memory[start + 1]], memory[memory[start + 2]])
+                except (UnknownInstruction, IndexError) as error:
+                    self._fail([i], error)
+                    continue
+                width = intcode_class.WIDTHS[instruction]
+                still_running.append((i, start + width))
+            running = still_running
+
+    def _run_commands_numpy(self):
+        ''' Run the commands for all rows at once. The rows that are still
+        running are grouped by instruction pointer and split by opcode at
+        each command, so rows only share a command while their pointers
+        agree. Rows that all share the opcode skip the split.
+        '''
+        if self._memory.dtype != object:
+            self._bound = self._largest(self._memory)
+
+        running = {0: numpy.arange(self._size)}
+        while running:
+            still_running = {}
+            for start, rows in running.items():
+                if start >= self._length:
+                    self._fail(rows, IndexError("list index out of range"))
+                    continue
+
+                for opcode, group in self._split_by_opcode(rows, start):
+                    following, group = self._run_command(opcode, group, start)
+                    if group.size:
+                        groups = still_running.setdefault(following, [])
+                        groups.append(group)
+
+            running = {start: groups[0] if len(groups) == 1
+                       else numpy.sort(numpy.concatenate(groups))
+                       for start, groups in still_running.items()}
+
+    def _run_command(self, opcode, rows, start):
+        ''' Run the command at a position for a group of rows sharing its
+        opcode
+        :return: Position of the next command and the rows still running
+        :rtype: tuple(int, numpy.ndarray)
+        '''
+        intcode_class = self._intcode_class
+        if opcode == intcode_class.HALT:
+            for row in rows:
+                self._halted[int(row)] = True
+            return start, rows[:0]
+
+        operation = intcode_class.OPERATIONS.get(opcode)
+        if operation is None:
+            self._fail(rows, intcode_class._unknown_instruction(opcode))
+            return start, rows[:0]
+
+        width = intcode_class.WIDTHS[opcode]
+        if start + width > self._length:
+            self._fail(rows, IndexError("list index out of range"))
+            return start, rows[:0]
+
+        return start + width, self._run_operation(rows, start, operation)
+
+    def _index(self, rows):
+        ''' Index for a group of rows, a plain slice while every row of the
+        batch is in the group so whole columns are read without gathering
+        '''
+        return slice(None) if rows.size == self._size else rows
+
+    @staticmethod
+    def _largest(values):
+        ''' Largest magnitude in an array, or 0 if it is empty '''
+        if not values.size:
+            return 0
+        return max(-int(values.min()), int(values.max()))
+
+    def _split_by_opcode(self, rows, start):
+        ''' Split a group of rows by the opcode at a position
+        :return: List of (opcode, rows) for each opcode found
+        :rtype: list[tuple(int, numpy.ndarray)]
+        '''
+        opcodes = self._memory[self._index(rows), start]
+        if opcodes.size and (opcodes == opcodes[0]).all():
+            return [(int(opcodes[0]), rows)]
+        return [(int(opcode), rows[opcodes == opcode])
+                for opcode in numpy.unique(opcodes)]
+
+    def _run_operation(self, rows, start, operation):
+        ''' Run an arithmetic command at a position for a group of rows.
+        Each operand column is checked against memory once, and addresses
+        shared by every row read and write whole columns.
+        :return: Rows that ran without failing
+        '''
+        memory = self._memory
+        length = self._length
+        index = self._index(rows)
+
+        columns = [memory[index, start + k] for k in (1, 2, 3)]
+        extremes = [(int(c.min()), int(c.max())) for c in columns]
+        if any(low < -length or high >= length for low, high in extremes):
+            # Fail the rows with a position outside of memory
+            valid = numpy.ones(rows.size, dtype=bool)
+            for column in columns:
+                inside = (column >= -length) & (column < length)
+                valid &= numpy.asarray(inside, dtype=bool)
+            self._fail(rows[~valid], IndexError("list index out of range"))
+            rows = rows[valid]
+            if rows.size:
+                self._run_operation(rows, start, operation)
+            return rows
+
+        operands = []
+        for column, (low, high) in zip(columns, extremes):
+            if low == high:
+                operands.append(low)
             else:
-                msg = "Unknown INSTRUCTION: {} Choices: {}"
-                msg = msg.format(instruction, ','.join(self.INSTRUCTION_CHOICES))
-                raise UnknownInstruction(msg)
+                operands.append(numpy.asarray(column, dtype=numpy.int64))
+        first, second, output = operands
+
+        result = self._apply(operation,
+                             self._read(rows, index, first),
+                             self._read(rows, index, second))
+        if isinstance(output, int):
+            self._memory[index, output] = result
+        else:
+            self._memory[rows, output] = result
+        return rows
+
+    def _read(self, rows, index, address):
+        ''' Read an operand for a group of rows from a shared address or
+        from an address per row
+        '''
+        if isinstance(address, int):
+            return self._memory[index, address]
+        return self._memory[rows, address]
+
+    @staticmethod
+    def _combined_bound(operation, first, second):
+        ''' Largest magnitude of an operation on values within the given
+        magnitudes, or None for operations other than add and multiply
+        '''
+        if operation is operator.add:
+            return first + second
+        if operation is operator.mul:
+            return first * second
+        return None
+
+    def _apply(self, operation, first, second):
+        ''' Apply an operation to the operands of a group of rows. The
+        operands are only checked while the largest value in memory could
+        overflow 64 bits, and memory switches to Python ints when the result
+        does not fit.
+        '''
+        if self._memory.dtype == object:
+            return operation(first, second)
+
+        largest = self._combined_bound(operation, self._bound, self._bound)
+        if largest is None or largest >= self.INT64_LIMIT:
+            largest = self._combined_bound(operation, self._largest(first),
+                                           self._largest(second))
+
+        if largest is not None and largest < self.INT64_LIMIT:
+            result = operation(first, second)
+        else:
+            # Compute with Python ints, keeping 64 bits if the result fits
+            result = operation(first.astype(object), second.astype(object))
+            if self._largest(result) >= self.INT64_LIMIT:
+                self._memory = self._memory.astype(object)
+                return result
+            result = result.astype(numpy.int64)
+
+        self._bound = max(self._bound, self._largest(result))
+        return result
+
+
+def search_inputs_batch(code, target, ranges=(range(100), range(100)),
+                        positions=(1, 2), output_position=0,
+                        batch_size=10000, intcode_class=IntCode):
+    ''' Search for the inputs that make a program produce a target value
+    by running the candidate inputs in lockstep batches
+    :param code: Program to search the inputs for
+    :type code: list[int]
+    :param target: Value wanted at the output position after halting
+    :type target: int
+    :param ranges: Range of values to try for each input
+                   (default: nouns and verbs in 0-99)
+    :type ranges: list[range]
+    :param positions: Positions in memory to place the inputs
+    :type positions: list[int]
+    :param output_position: Position in memory with the output
+    :type output_position: int
+    :param batch_size: Number of candidate inputs run per batch
+    :type batch_size: int
+    :param intcode_class: IntCode class to run the program with
+                          (default: IntCode)
+    :type intcode_class: type
+    :return: First inputs (in order of the ranges) that give the target,
+             or None if there are none
+    :rtype: tuple(int)
+    '''
+    candidates = itertools.product(*ranges)
+    while True:
+        batch_inputs = list(itertools.islice(candidates, batch_size))
+        if not batch_inputs:
+            return None
+
+        batch = BatchIntCode(code, len(batch_inputs), intcode_class)
+        for i, position in enumerate(positions):
+            batch.write(position, [inputs[i] for inputs in batch_inputs])
+        batch.run_commands()
+
+        outputs = batch.read(output_position)
+        for inputs, halted, output in zip(batch_inputs, batch.halted,
+                                          outputs):
+            if halted and output == target:
+                return inputs
+
+
+class SymbolicFallback(Exception):
+    ''' Raise if a program can not be run on symbolic values '''
+
+
+class Polynomial:
+    ''' Polynomial with integer coefficients over a fixed number of
+    variables, stored as a map of exponent tuples to coefficients
+    '''
+
+    def __init__(self, terms, number_of_variables):
+        ''' Initialize a Polynomial from its terms
+        :param terms: Map of exponents (one per variable) to coefficient
+        :type terms: dict[tuple(int), int]
+        :param number_of_variables: Number of variables
+        :type number_of_variables: int
+        '''
+        self._terms = {k: v for k, v in terms.items() if v != 0}
+        self._number_of_variables = number_of_variables
+
+    @classmethod
+    def constant(cls, value, number_of_variables):
+        ''' Create a constant Polynomial '''
+        return cls({(0,) * number_of_variables: value}, number_of_variables)
+
+    @classmethod
+    def variable(cls, index, number_of_variables):
+        ''' Create a Polynomial for a single variable '''
+        exponents = tuple(int(i == index) for i in range(number_of_variables))
+        return cls({exponents: 1}, number_of_variables)
+
+    def __add__(self, other):
+        terms = dict(self._terms)
+        for exponents, coefficient in other._terms.items():
+            terms[exponents] = terms.get(exponents, 0) + coefficient
+        return Polynomial(terms, self._number_of_variables)
+
+    def __mul__(self, other):
+        terms = {}
+        for e1, c1 in self._terms.items():
+            for e2, c2 in other._terms.items():
+                exponents = tuple(map(operator.add, e1, e2))
+                terms[exponents] = terms.get(exponents, 0) + c1 * c2
+        return Polynomial(terms, self._number_of_variables)
+
+    def __eq__(self, other):
+        return self._terms == other._terms
+
+    def __repr__(self):
+        return "Polynomial({})".format(self._terms)
+
+    @property
+    def terms(self):
+        ''' Gets the map of exponents to coefficients '''
+        return self._terms
+
+    @property
+    def is_constant(self):
+        ''' Gets whether the Polynomial has no variables '''
+        return all(not any(exponents) for exponents in self._terms)
+
+    def evaluate(self, values):
+        ''' Evaluate the Polynomial for the given variable values
+        :param values: Value for each variable
+        :type values: list[int]
+        :return: Value of the Polynomial
+        :rtype: int
+        '''
+        total = 0
+        for exponents, coefficient in self._terms.items():
+            for value, exponent in zip(values, exponents):
+                coefficient *= value ** exponent
+            total += coefficient
+        return total
+
+    def coefficients_of_last(self, values):
+        ''' Substitute values for all but the last variable and return
+        the coefficients of the last variable by degree
+        :param values: Value for each variable except the last
+        :type values: list[int]
+        :return: Coefficients, where index i is the coefficient of x**i
+        :rtype: list[int]
+        '''
+        coefficients = {}
+        for exponents, coefficient in self._terms.items():
+            for value, exponent in zip(values, exponents[:-1]):
+                coefficient *= value ** exponent
+            degree = exponents[-1]
+            coefficients[degree] = coefficients.get(degree, 0) + coefficient
+        degree = max(coefficients) if coefficients else 0
+        return [coefficients.get(i, 0) for i in range(degree + 1)]
+
+
+class SymbolicMemory:
+    ''' Memory of a program with symbolic values at the input positions,
+    used by symbolic_output. Each written position holds a Polynomial of
+    the inputs, or None if the value was read through an address that
+    depends on the inputs and so is unknown.
+    '''
+
+    def __init__(self, memory, positions):
+        ''' Initialize a SymbolicMemory over a program
+        :param memory: Program with the concrete values of memory
+        :type memory: list[int] or ProgramImage
+        :param positions: Positions in memory of the symbolic inputs
+        :type positions: list[int]
+        '''
+        self._memory = memory
+        self._number_of_variables = len(positions)
+        self._symbols = {}
+        for index, position in enumerate(positions):
+            self._symbols[self.cell(position)] = Polynomial.variable(
+                index, self._number_of_variables)
+        self._addresses = []
+
+    def __len__(self):
+        return len(self._memory)
+
+    def cell(self, position):
+        ''' Normalize a position, since negative addresses index from the
+        end as they do in the interpreter
+        '''
+        if -len(self._memory) <= position < 0:
+            return position + len(self._memory)
+        return position
+
+    def value(self, position):
+        ''' Gets the Polynomial at a position, or None if it is unknown '''
+        position = self.cell(position)
+        if position in self._symbols:
+            return self._symbols[position]
+        return Polynomial.constant(self._memory[position],
+                                   self._number_of_variables)
+
+    def concrete(self, position):
+        ''' Gets the value at a position that must not depend on the inputs
+        :raises SymbolicFallback: If the value depends on the inputs
+        '''
+        polynomial = self.value(position)
+        if polynomial is None or not polynomial.is_constant:
+            msg = "Position {} depends on the inputs".format(position)
+            raise SymbolicFallback(msg)
+        return polynomial.evaluate([0] * self._number_of_variables)
+
+    def read(self, address_position):
+        ''' Gets the value at the address stored at a position. Addresses
+        that depend on the inputs are recorded and read an unknown value.
+        :raises SymbolicFallback: If the address itself is unknown
+        '''
+        address = self.value(address_position)
+        if address is None:
+            msg = "Position {} is unknown".format(address_position)
+            raise SymbolicFallback(msg)
+        if not address.is_constant:
+            self._addresses.append(address)
+            return None
+        return self.value(self.concrete(address_position))
+
+    def store(self, address_position, value):
+        ''' Store a value at the address stored at a position, which must
+        not depend on the inputs
+        :raises IndexError: If the address is outside of memory
+        '''
+        address = self.cell(self.concrete(address_position))
+        if not 0 <= address < len(self._memory):
+            raise IndexError("list assignment index out of range")
+        self._symbols[address] = value
+
+    @property
+    def addresses(self):
+        ''' Gets the read addresses that depend on the inputs '''
+        return self._addresses
+
+
+def symbolic_output(code, positions=(1, 2), output_position=0,
+                    intcode_class=IntCode):
+    ''' Run a program with symbolic values at the input positions and
+    return the value at the output position as a Polynomial of the inputs.
+    Only operations that add or multiply are supported, and every
+    instruction and output address must not depend on the inputs. Values
+    read through an address that depends on the inputs are unknown, which
+    is fine as long as they never reach the output, an instruction or an
+    address. Those read addresses are returned too, since the inputs must
+    keep them in memory.
+    :param code: Program to analyse
+    :type code: list[int]
+    :param positions: Positions in memory of the symbolic inputs
+    :type positions: list[int]
+    :param output_position: Position in memory with the output
+    :type output_position: int
+    :param intcode_class: IntCode class with the instruction tables
+                          (default: IntCode)
+    :type intcode_class: type
+    :return: Polynomial of the inputs at the output position and the list
+             of read addresses that depend on the inputs as Polynomials
+    :rtype: tuple(Polynomial, list[Polynomial])
+    :raises SymbolicFallback: If the program can not be run symbolically
+    '''
+    if isinstance(code, ProgramImage):
+        memory = SymbolicMemory(code, positions)
+    else:
+        memory = SymbolicMemory([int(x) for x in code], positions)
+
+    try:
+        start = 0
+        while start < len(memory):
+            instruction = memory.concrete(start)
+            if instruction == intcode_class.HALT:
+                output = memory.value(output_position)
+                if output is None:
+                    raise SymbolicFallback("Output is unknown")
+                return output, memory.addresses
+
+            operation = intcode_class.OPERATIONS.get(instruction)
+            if operation not in _OPERATION_SYMBOLS:
+                msg = "Unsupported INSTRUCTION: {}".format(instruction)
+                raise SymbolicFallback(msg)
+
+            value1 = memory.read(start + 1)
+            value2 = memory.read(start + 2)
+            result = None
+            if value1 is not None and value2 is not None:
+                result = operation(value1, value2)
+            memory.store(start + 3, result)
+            start += intcode_class.WIDTHS[instruction]
+    except IndexError:
+        raise SymbolicFallback("Program reads outside of memory")
+    raise SymbolicFallback("Program does not halt")
+
+
+def _solve_last(coefficients, target, values):
+    ''' Find the values of the last variable, in order, for which the
+    polynomial with the given coefficients equals the target
+    '''
+    constant = coefficients[0] - target
+    if len(coefficients) == 1:
+        return values if constant == 0 else []
+
+    if len(coefficients) == 2:
+        slope = coefficients[1]
+        if slope == 0 or constant % slope:
+            return [] if slope or constant else values
+        root = -constant // slope
+        return [root] if root in values else []
+
+    # No closed form, so evaluate the higher degree polynomial directly
+    return [x for x in values
+            if sum(c * x ** i for i, c in enumerate(coefficients)) == target]
+
+
+def solve_inputs(code, target, ranges=(range(100), range(100)),
+                 positions=(1, 2), output_position=0, workers=None,
+                 intcode_class=IntCode):
+    ''' Find the inputs that make a program produce a target value by
+    deriving the output as a Polynomial of the inputs once and solving it.
+    Falls back to search_inputs if the program can not be run symbolically.
+    :param code: Program to solve the inputs for
+    :type code: list[int]
+    :param target: Value wanted at the output position after halting
+    :type target: int
+    :param ranges: Range of values allowed for each input
+    :type ranges: list[range]
+    :param positions: Positions in memory to place the inputs
+    :type positions: list[int]
+    :param output_position: Position in memory with the output
+    :type output_position: int
+    :param workers: Number of processes used by the fallback search
+    :type workers: int
+    :param intcode_class: IntCode class to run the program with
+                          (default: IntCode)
+    :type intcode_class: type
+    :return: First inputs (in order of the ranges) that give the target,
+             or None if there are none
+    :rtype: tuple(int)
+    '''
+    try:
+        polynomial, addresses = symbolic_output(code, positions,
+                                                output_position,
+                                                intcode_class)
+    except SymbolicFallback:
+        return search_inputs(code, target, ranges, positions,
+                             output_position, workers=workers,
+                             intcode_class=intcode_class)
+
+    # Inputs are only valid if every address they select is in memory
+    size = len(code)
+
+    def valid(inputs):
+        return all(-size <= address.evaluate(inputs) < size
+                   for address in addresses)
+
+    for values in itertools.product(*ranges[:-1]):
+        coefficients = polynomial.coefficients_of_last(values)
+        for root in _solve_last(coefficients, target, ranges[-1]):
+            inputs = tuple(values) + (root,)
+            if valid(inputs):
+                return inputs
+    return None
 
 
 if __name__ == "__main__":
@@ -117,36 +1496,46 @@ if __name__ == "__main__":
     parser.add_argument("--part", type=int, default=1,
                         choices=[1, 2],
                         help="Either sovling part 1 or part 2 of problem")
+    parser.add_argument("--memory", type=str, default=IntCode.LIST,
+                        choices=IntCode.MEMORY_CHOICES,
+                        help="Memory backend for part 1")
+    parser.add_argument("--symbolic", action="store_true",
+                        help="Solve part 2 symbolically instead of searching")
+    parser.add_argument("--batch", action="store_true",
+                        help="Search part 2 with the lockstep batch VM")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print an instruction profile for part 1")
     args = parser.parse_args()
 
-    # Read in input file with list of masses and parse
-    with open(args.input_file, 'r') as f:
-        contents = f.readline()
-    code = [int(x.strip()) for x in contents.split(',')]
+    # Read in input file with list of instructions and parse
+    code = load_program(args.input_file)
 
     if args.part == 1:
         # Initialize IntCode object
-        intcode = IntCode(code)
+        intcode = IntCode(code, memory=args.memory)
 
         # Replace the values per the instructions
         intcode._memory[1] = 12
         intcode._memory[2] = 2
 
+        if args.profile:
+            intcode.profiler = Profiler(trace_size=10)
+
         # Print output to screen for the solution
         print("Output: {}".format(intcode.run_commands()))
 
+        if args.profile:
+            print(intcode.profiler.report())
+
     if args.part == 2:
         target = 19690720
 
-        span = range(0,100)
-        for noun in span:
-            for verb in span:
-                intcode = IntCode(code)
-                intcode._memory[1] = noun
-                intcode._memory[2] = verb
-
-                intcode.run_commands()
-
-                if intcode._memory[0] == target:
-                    print("Hit target!!! Noun: {} Verb: {} 100*Noun+Verb: {}".format(noun, verb, 100*noun+verb))
-
+        if args.symbolic:
+            hit = solve_inputs(code, target)
+        elif args.batch:
+            hit = search_inputs_batch(code, target)
+        else:
+            hit = search_inputs(code, target)
+        if hit is not None:
+            noun, verb = hit
+            print("Hit target!!! Noun: {} Verb: {} 100*Noun+Verb: {}".format(noun, verb, 100*noun+verb))
@@ -1,5 +1,25 @@
+import io
+import operator
+import os
+from array import array
+
 import pytest
-from intcode import IntCode, UnknownInstruction
+import intcode as intcode_module
+from intcode import (IntCode, BatchIntCode, MemoryDump, Profiler,
+                     InvalidOperation, ProgramImage, UnknownInstruction, UnknownMemoryBackend, NoSnapshot,
+                     SymbolicFallback, compile_program, load_program,
+                     search_inputs, search_inputs_batch, solve_inputs, symbolic_output)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    ''' Run a test with NumPy and with the pure Python fallback '''
+    if request.param == "numpy":
+        if intcode_module.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(intcode_module, "numpy", None)
+    return request.param
 
 
 def test_construction():
@@ -17,6 +37,34 @@ def test_construction():
     assert intcode._memory != input_code
 
 
+def test_program_image():
+    image = ProgramImage.parse("1, 0,0,3,99\n")
+    assert image == (1, 0, 0, 3, 99)
+
+    # Memory is a mutable copy and the image is left untouched
+    intcode = IntCode(image)
+    assert intcode._memory == [1, 0, 0, 3, 99]
+    intcode.run_commands()
+    assert intcode._memory[3] == 2
+    assert image == (1, 0, 0, 3, 99)
+
+    intcode = IntCode(image, memory=IntCode.ARRAY)
+    assert intcode._memory == array('q', image)
+    assert BatchIntCode(image, 2).read(4) == [99, 99]
+
+
+def test_load_program(tmp_path):
+    path = tmp_path / "input"
+    path.write_text("1,0,0,3,99\n")
+    image = load_program(str(path))
+    assert image == (1, 0, 0, 3, 99)
+    assert load_program(str(path)) is image
+
+    # A changed file is parsed again
+    path.write_text("2,0,0,3,99,7\n")
+    assert load_program(str(path)) == (2, 0, 0, 3, 99, 7)
+
+
 def test_product():
     assert IntCode.product([1, 2, 3, 4]) == 24
 
@@ -131,3 +179,388 @@ def test_run_commands_invalid_instruction():
     intcode = IntCode(input_code)
     with pytest.raises(UnknownInstruction):
         intcode.run_commands()
+
+
+def test_run_commands_generic_matches_fast():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    generic = IntCode(input_code)
+    fast = IntCode(input_code)
+    assert generic._run_commands_generic() == fast._run_commands_fast()
+    assert generic._memory == fast._memory
+
+
+def test_run_commands_stride():
+    input_code = [1, 6, 7, 8, 0, 99, 10, 20, 30]
+    intcode = IntCode(input_code, stride=5)
+    intcode.run_commands()
+    assert intcode._memory == [60, 6, 7, 8, 0, 99, 10, 20, 30]
+
+
+def test_run_commands_past_end():
+    # Without a halt command the instruction pointer runs off memory
+    intcode = IntCode([1, 0, 0, 0])
+    with pytest.raises(IndexError):
+        intcode.run_commands()
+
+
+def test_run_commands_new_opcode(backend):
+    class SubtractIntCode(IntCode):
+        OPERATIONS = {**IntCode.OPERATIONS, 3: lambda a, b: a - b}
+        WIDTHS = {**IntCode.WIDTHS, 3: 4}
+
+    input_code = [3, 9, 10, 0, 2, 0, 11, 0, 99, 50, 8, 2]
+    intcode = SubtractIntCode(input_code)
+    intcode.run_commands()
+    assert intcode._memory[0] == 84
+    intcode = SubtractIntCode(input_code)
+    intcode.profiler = Profiler()
+    intcode.run_commands()
+    assert intcode._memory[0] == 84
+    intcode = SubtractIntCode(input_code)
+    intcode.run_compiled()
+    assert intcode._memory[0] == 84
+    intcode = SubtractIntCode(input_code + [0], stride=4)
+    intcode._run_commands_generic()
+    assert intcode._memory[0] == 84
+
+    # The batch VM and the solvers use the tables of the given class
+    batch = BatchIntCode(input_code, 2, intcode_class=SubtractIntCode)
+    batch.run_commands()
+    assert batch.read(0) == [84, 84]
+    assert search_inputs(input_code, 84, ranges=(range(60), range(3)),
+                         positions=(9, 11), workers=1,
+                         intcode_class=SubtractIntCode) == (50, 2)
+    assert search_inputs_batch(input_code, 84, ranges=(range(60), range(3)),
+                               positions=(9, 11),
+                               intcode_class=SubtractIntCode) == (50, 2)
+    with pytest.raises(SymbolicFallback):
+        symbolic_output(input_code, positions=(9, 11),
+                        intcode_class=SubtractIntCode)
+    assert solve_inputs(input_code, 84, ranges=(range(60), range(3)),
+                        positions=(9, 11), workers=1,
+                        intcode_class=SubtractIntCode) == (50, 2)
+
+
+def test_operation_width():
+    # Operations are binary 3-address commands, other widths are rejected
+    with pytest.raises(InvalidOperation):
+        class NegateIntCode(IntCode):
+            OPERATIONS = {**IntCode.OPERATIONS, 3: operator.neg}
+            WIDTHS = {**IntCode.WIDTHS, 3: 3}
+
+
+def test_search_inputs():
+    # Computes memory[0] = memory[9] * memory[10] + memory[11]
+    input_code = [2, 9, 10, 0, 1, 0, 11, 0, 99, 0, 0, 7]
+
+    hit = search_inputs(input_code, 31, ranges=(range(10), range(10)),
+                        positions=(9, 10), workers=1, chunk_size=3)
+    assert hit == (3, 8)
+
+    hit = search_inputs(input_code, 31, ranges=(range(10), range(10)),
+                        positions=(9, 10), workers=2)
+    assert hit == (3, 8)
+
+    hit = search_inputs(input_code, -1, ranges=(range(5), range(5)),
+                        positions=(9, 10), workers=1)
+    assert hit is None
+
+
+def test_symbolic_output():
+    input_code = [2, 9, 10, 0, 1, 0, 11, 0, 99, 0, 0, 7]
+    polynomial, addresses = symbolic_output(input_code, positions=(9, 10))
+    assert polynomial.terms == {(1, 1): 1, (0, 0): 7}
+    assert polynomial.evaluate([3, 8]) == 31
+    assert addresses == []
+
+    # Value read through an input dependent address reaches the output
+    input_code = [1, 5, 5, 0, 99, 0]
+    with pytest.raises(SymbolicFallback):
+        symbolic_output(input_code, positions=(1, 2))
+
+    # Output address depends on the inputs
+    input_code = [1, 5, 5, 0, 99, 0]
+    with pytest.raises(SymbolicFallback):
+        symbolic_output(input_code, positions=(3,))
+
+    # Unknown value is overwritten before it reaches the output
+    input_code = [1, 0, 0, 3, 1, 1, 2, 0, 99]
+    polynomial, addresses = symbolic_output(input_code, positions=(1, 2))
+    assert polynomial.terms == {(1, 0): 1, (0, 1): 1}
+    assert len(addresses) == 2
+
+
+def test_solve_inputs():
+    input_code = [2, 9, 10, 0, 1, 0, 11, 0, 99, 0, 0, 7]
+    ranges = (range(10), range(10))
+    hit = solve_inputs(input_code, 31, ranges=ranges, positions=(9, 10))
+    assert hit == search_inputs(input_code, 31, ranges=ranges,
+                                positions=(9, 10), workers=1)
+    assert solve_inputs(input_code, -1, ranges=ranges,
+                        positions=(9, 10)) is None
+
+    # Falls back to searching when the output depends on read addresses
+    input_code = [1, 0, 0, 0, 99, 5, 6]
+    assert solve_inputs(input_code, 11, ranges=ranges, workers=1) == \
+        search_inputs(input_code, 11, ranges=ranges, workers=1)
+
+    # Skips inputs that select addresses outside of memory
+    input_code = [1, 0, 0, 3, 1, 1, 2, 0, 99]
+    ranges = (range(20), range(20))
+    assert solve_inputs(input_code, 12, ranges=ranges) == (4, 8)
+    assert search_inputs(input_code, 12, ranges=ranges, workers=1) == (4, 8)
+
+    # A negative address is the same cell as its offset from the end
+    input_code = [1, 1, 2, -1, 1, 9, 9, 0, 99, 0]
+    assert solve_inputs(input_code, 4) == (0, 0)
+    assert search_inputs(input_code, 4, workers=1) == (0, 0)
+
+
+def test_solve_inputs_day_2():
+    code = load_program(os.path.join(os.path.dirname(__file__), "input"))
+    noun, verb = solve_inputs(code, 19690720)
+    intcode = IntCode(code)
+    intcode._memory[1] = noun
+    intcode._memory[2] = verb
+    intcode.run_commands()
+    assert intcode._memory[0] == 19690720
+
+
+def test_snapshot_restore():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    intcode = IntCode(input_code)
+    assert intcode.snapshot() == tuple(input_code)
+
+    intcode.write(9, 1)
+    intcode.run_commands()
+    assert intcode._memory == [2050, 9, 10, 41, 2, 3, 11, 0, 99, 1, 40, 50]
+    assert intcode._dirty == {0, 3, 9}
+
+    intcode.restore()
+    assert intcode._memory == input_code
+    assert not intcode._dirty
+
+    intcode.run_commands()
+    assert intcode._memory == [3500, 9, 10, 70, 2, 3, 11, 0, 99, 30, 40, 50]
+
+
+def test_restore_without_snapshot():
+    intcode = IntCode([99])
+    with pytest.raises(NoSnapshot):
+        intcode.restore()
+
+
+def test_run_compiled():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    intcode = IntCode(input_code)
+    assert intcode.run_compiled() == "3500,9,10,70,2,3,11,0,99,30,40,50"
+    assert compile_program(input_code) is compile_program(list(input_code))
+
+    # Programs that only differ in their inputs share a function
+    patched = list(input_code)
+    patched[1:3] = [10, 9]
+    patched[9] = 7
+    assert compile_program(patched) is compile_program(input_code)
+    patched[4] = 1
+    assert compile_program(patched) is not compile_program(input_code)
+
+    # Same compiled program with a changed input
+    intcode = IntCode(input_code)
+    intcode.compile()
+    intcode.write(9, 1)
+    intcode.run_compiled()
+    assert intcode._memory == [2050, 9, 10, 41, 2, 3, 11, 0, 99, 1, 40, 50]
+
+
+def test_run_compiled_self_modifying():
+    # First command turns the second command from ADD into MULTIPLY
+    input_code = [1, 0, 0, 4, 1, 9, 10, 0, 99, 3, 4]
+    interpreted = IntCode(input_code)
+    compiled = IntCode(input_code)
+    assert compiled.run_compiled() == interpreted.run_commands()
+    assert compiled._memory[0] == 12
+
+
+def test_run_compiled_invalid_instruction():
+    for input_code in ([5, 0, 0, 0, 99], [1, 9, 10, 4, 1, 0, 0, 0, 99, 2, 3]):
+        intcode = IntCode(input_code)
+        with pytest.raises(UnknownInstruction):
+            intcode.run_compiled()
+
+        intcode = IntCode(input_code)
+        with pytest.raises(UnknownInstruction):
+            intcode.run_commands()
+
+
+def test_run_compiled_journal():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    intcode = IntCode(input_code)
+    intcode.compile()
+    intcode.snapshot()
+    intcode.run_compiled()
+    assert intcode._dirty == {0, 3}
+    intcode.restore()
+    assert intcode._memory == input_code
+
+
+def test_memory_dump():
+    dump = MemoryDump([1, 0, 0, 3, 99], chunk_size=2)
+    assert list(dump) == ["1,0", ",0,3", ",99"]
+    assert str(dump) == "1,0,0,3,99"
+    assert dump == "1,0,0,3,99"
+    assert dump != "1,0,0,3"
+
+    stream = io.StringIO()
+    dump.write(stream)
+    assert stream.getvalue() == "1,0,0,3,99"
+
+
+def test_output_is_snapshot():
+    intcode = IntCode([1, 0, 0, 0, 99])
+    intcode.snapshot()
+    output = intcode.run_commands()
+    assert isinstance(output, str)
+    intcode.restore()
+    assert output == "2,0,0,0,99"
+    assert intcode.run_compiled() == "2,0,0,0,99"
+
+
+def test_dump():
+    intcode = IntCode([1, 0, 0, 0, 99])
+    intcode.run_commands()
+    dump = intcode.dump(chunk_size=2)
+    assert list(dump) == ["2,0", ",0,0", ",99"]
+
+    stream = io.StringIO()
+    intcode.write_memory(stream)
+    assert stream.getvalue() == "2,0,0,0,99"
+
+
+def test_array_memory():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    intcode = IntCode(input_code, memory=IntCode.ARRAY)
+    assert intcode._memory == array('q', input_code)
+    assert intcode.run_commands() == "3500,9,10,70,2,3,11,0,99,30,40,50"
+
+    with pytest.raises(UnknownMemoryBackend):
+        IntCode(input_code, memory='tape')
+
+
+def test_array_memory_overflow():
+    # Squares position 13 three times, past the range of 64-bit ints
+    input_code = [2, 13, 13, 13, 2, 13, 13, 13, 2, 13, 13, 13, 99, 2 ** 20]
+    target = IntCode(input_code)
+    target.run_commands()
+    assert target._memory[13] == 2 ** 160
+
+    for method in ("_run_commands_fast", "_run_commands_generic",
+                   "run_compiled"):
+        intcode = IntCode(input_code, memory=IntCode.ARRAY)
+        assert isinstance(intcode._memory, array)
+        getattr(intcode, method)()
+        assert intcode._memory == target._memory
+
+
+def test_array_memory_write_overflow():
+    intcode = IntCode([1, 0, 0, 0, 99, 0], memory=IntCode.ARRAY)
+    intcode.snapshot()
+    intcode.write(5, 2 ** 70)
+    assert not isinstance(intcode._memory, array)
+    assert intcode._memory == [1, 0, 0, 0, 99, 2 ** 70]
+    intcode.restore()
+    assert intcode._memory == [1, 0, 0, 0, 99, 0]
+
+
+def test_profiler():
+    input_code = [1, 9, 10, 3, 2, 3, 11, 0, 99, 30, 40, 50]
+    intcode = IntCode(input_code)
+    intcode.profiler = Profiler(trace_size=2)
+    output = intcode.run_commands()
+    assert output == "3500,9,10,70,2,3,11,0,99,30,40,50"
+
+    profiler = intcode.profiler
+    assert profiler.opcode_counts == {1: 1, 2: 1, 99: 1}
+    assert profiler.instruction_count == 3
+    assert profiler.address_counts[3] == 2
+    assert len(profiler.run_times) == 1
+    assert profiler.trace == [(4, (2, 3, 11, 0)), (8, (99,))]
+    assert profiler.report().startswith("Runs: 1 Instructions: 3")
+
+    # Compiled runs are profiled through the interpreter
+    intcode = IntCode(input_code)
+    intcode.profiler = profiler
+    intcode.run_compiled()
+    assert profiler.instruction_count == 6
+    assert len(profiler.run_times) == 2
+    assert profiler.trace[-1] == (8, (99,))
+
+
+def test_profiler_invalid_instruction():
+    intcode = IntCode([5, 0, 0, 0, 99])
+    intcode.profiler = Profiler()
+    with pytest.raises(UnknownInstruction):
+        intcode.run_commands()
+    assert intcode.profiler.opcode_counts == {5: 1}
+    assert len(intcode.profiler.run_times) == 1
+    assert intcode.profiler.trace == []
+
+
+def run_each(input_code, patches):
+    ''' Run an IntCode object per patch and return memories and errors '''
+    memories, errors = [], []
+    for patch in patches:
+        intcode = IntCode(input_code)
+        for position, value in patch.items():
+            intcode._memory[position] = value
+        try:
+            intcode.run_commands()
+            errors.append(None)
+        except (UnknownInstruction, IndexError) as error:
+            errors.append(type(error))
+        memories.append(list(intcode._memory))
+    return memories, errors
+
+
+def test_batch_intcode(backend):
+    # First command turns the second into ADD, MULTIPLY, HALT or an
+    # unknown instruction, and position 5 may be outside of memory
+    input_code = [1, 12, 13, 4, 0, 9, 10, 0, 99, 3, 4, 0, 0, 0]
+    patches = [{5: 9, 12: 0, 13: 1}, {5: 9, 12: 0, 13: 2},
+               {5: 9, 12: 0, 13: 7}, {5: 9, 12: 0, 13: 99},
+               {5: 50, 12: 0, 13: 1}, {5: 9, 12: 1, 13: 1}]
+    memories, errors = run_each(input_code, patches)
+
+    batch = BatchIntCode(input_code, len(patches))
+    for position in (5, 12, 13):
+        batch.write(position, [patch[position] for patch in patches])
+    batch.run_commands()
+
+    for row, (memory, error) in enumerate(zip(memories, errors)):
+        assert [int(x) for x in batch.memory[row]] == memory
+        assert batch.halted[row] == (error is None)
+        assert type(batch.errors.get(row)) is (error or type(None))
+    assert batch.read(0)[0] == 7
+
+
+def test_batch_intcode_overflow(backend):
+    input_code = [2, 13, 13, 13, 2, 13, 13, 13, 2, 13, 13, 13, 99, 2 ** 20]
+    batch = BatchIntCode(input_code, 2)
+    batch.write(13, [2 ** 20, 3])
+    batch.run_commands()
+    assert batch.read(13) == [2 ** 160, 3 ** 8]
+
+    # A large value elsewhere in memory does not switch small results
+    batch = BatchIntCode([2, 5, 5, 5, 99, 3, 2 ** 40], 2)
+    batch.run_commands()
+    assert batch.read(5) == [9, 9]
+    assert getattr(batch.memory, "dtype", None) != object
+
+
+def test_search_inputs_batch(backend):
+    input_code = [2, 9, 10, 0, 1, 0, 11, 0, 99, 0, 0, 7]
+    ranges = (range(10), range(10))
+    hit = search_inputs_batch(input_code, 31, ranges=ranges,
+                              positions=(9, 10), batch_size=7)
+    assert hit == (3, 8)
+    assert search_inputs_batch(input_code, -1, ranges=ranges,
+                               positions=(9, 10)) is None
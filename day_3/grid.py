@@ -1,15 +1,194 @@
 import argparse
+import heapq
 import itertools
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
 
 from wire import Wire
 
+
+class SegmentIndex:
+    ''' Persistent index of labelled, axis-aligned segments shared by all
+    Wires on a Grid. The open/close events of the indexed segments are kept
+    sorted and their rows (and columns) are kept in dicts, so a query only
+    sorts its own segments and merges them into a single sweep. Finding the
+    k touching points of S new segments against N indexed ones (and each
+    other) takes O(N + (S + k) log(N + S)), so adding many Wires at once
+    costs a single sweep rather than one per Wire.
+    '''
+
+    # Order events at the same position as: open rows, query, close rows
+    OPEN, QUERY, CLOSE = 0, 1, 2
+
+    def __init__(self):
+        self._rows = defaultdict(list)
+        self._columns = defaultdict(list)
+        self._row_events = []
+        self._column_events = []
+
+    @classmethod
+    def _open_close_events(cls, segments):
+        ''' Sorted events opening and closing each segment of a sweep
+
+        :param segments: Segments as (row, low, high, label)
+        :type segments: list[tuple(int, int, int, int)]
+        :return: Sorted list of (position, kind, row, 0, label)
+        '''
+        events = []
+        for row, low, high, label in segments:
+            events.append((low, cls.OPEN, row, 0, label))
+            events.append((high, cls.CLOSE, row, 0, label))
+        events.sort()
+        return events
+
+    @classmethod
+    def _query_events(cls, segments):
+        ''' Sorted events querying the active rows of a sweep, one for
+        each perpendicular segment
+
+        :param segments: Segments as (position, low, high, label)
+        :type segments: list[tuple(int, int, int, int)]
+        :return: Sorted list of (position, kind, low, high, label)
+        '''
+        return sorted((position, cls.QUERY, low, high, label)
+                      for position, low, high, label in segments)
+
+    @classmethod
+    def _sweep(cls, events):
+        ''' Find the crossings of a sweep-line over sorted events. Rows
+        are active while the sweep is within their range and each query
+        reports the active rows within its own range.
+
+        :param events: Sorted open, close and query events
+        :type events: iterable[tuple(int, int, int, int, int)]
+        :return: Generator of (position, row, row label, query label)
+        '''
+        # Active rows as sorted (row, label)
+        active = []
+        for position, kind, low, high, label in events:
+            if kind == cls.OPEN:
+                insort(active, (low, label))
+            elif kind == cls.CLOSE:
+                del active[bisect_left(active, (low, label))]
+            else:
+                start = bisect_left(active, (low,))
+                stop = bisect_left(active, (high + 1,))
+                for row, other in active[start:stop]:
+                    yield position, row, other, label
+
+    @staticmethod
+    def _collinear_overlaps(rows, new_rows, transpose=False):
+        ''' Find the points shared by segments with different labels
+        running along the same row (or column) of the Grid. Each row is
+        swept once, so every point is reported once with all the labels
+        covering it rather than once for every overlapping pair.
+
+        :param rows: Map of each row to its indexed segments
+        :type rows: dict
+        :param new_rows: Map of each row to its new segments, only points
+                         covered by one of these are reported
+        :type new_rows: dict
+        :param transpose: Return points as (row, value) instead of
+                          (value, row), used for vertical segments
+        :type transpose: bool
+        :return: Generator of (point, labels)
+        '''
+        for row, segments in new_rows.items():
+            # Events as (position, change, label, new)
+            events = []
+            for fresh, group in enumerate((rows.get(row, ()), segments)):
+                for low, high, label in group:
+                    events.append((low, 1, label, fresh))
+                    events.append((high + 1, -1, label, fresh))
+            events.sort()
+
+            active = Counter()
+            active_new = 0
+            for i, (position, change, label, fresh) in enumerate(events):
+                active[label] += change
+                if not active[label]:
+                    del active[label]
+                active_new += change * fresh
+
+                if i + 1 == len(events) or events[i + 1][0] == position:
+                    continue
+                if active_new and len(active) > 1:
+                    labels = tuple(active)
+                    for value in range(position, events[i + 1][0]):
+                        point = (row, value) if transpose else (value, row)
+                        yield point, labels
+
+    @staticmethod
+    def _rows_of(segments):
+        ''' Group segments by their row
+
+        :param segments: Segments as (row, low, high, label)
+        :type segments: list[tuple(int, int, int, int)]
+        :return: Map of each row to its segments as (low, high, label)
+        '''
+        rows = defaultdict(list)
+        for row, low, high, label in segments:
+            rows[row].append((low, high, label))
+        return rows
+
+    def query(self, horizontal, vertical):
+        ''' Find the points where the given segments touch any of the
+        indexed segments, or each other, under a different label
+
+        :param horizontal: Horizontal segments as (y, x_min, x_max, label)
+        :type horizontal: list[tuple(int, int, int, int)]
+        :param vertical: Vertical segments as (x, y_min, y_max, label)
+        :type vertical: list[tuple(int, int, int, int)]
+        :return: Generator of (point, labels) for each touching point
+        '''
+        # New vertical segments against all horizontal segments
+        events = heapq.merge(self._row_events,
+                             self._open_close_events(horizontal),
+                             self._query_events(vertical))
+        for x, y, other, label in self._sweep(events):
+            if other != label:
+                yield (x, y), (other, label)
+
+        # New horizontal segments against the indexed vertical segments
+        events = heapq.merge(self._column_events,
+                             self._query_events(horizontal))
+        for y, x, other, label in self._sweep(events):
+            yield (x, y), (other, label)
+
+        yield from self._collinear_overlaps(self._rows,
+                                            self._rows_of(horizontal))
+        yield from self._collinear_overlaps(self._columns,
+                                            self._rows_of(vertical),
+                                            transpose=True)
+
+    def add(self, horizontal, vertical):
+        ''' Add labelled segments to the index
+
+        :param horizontal: Horizontal segments as (y, x_min, x_max, label)
+        :type horizontal: list[tuple(int, int, int, int)]
+        :param vertical: Vertical segments as (x, y_min, y_max, label)
+        :type vertical: list[tuple(int, int, int, int)]
+        '''
+        for row, low, high, label in horizontal:
+            self._rows[row].append((low, high, label))
+        for column, low, high, label in vertical:
+            self._columns[column].append((low, high, label))
+        self._row_events = list(heapq.merge(
+            self._row_events, self._open_close_events(horizontal)))
+        self._column_events = list(heapq.merge(
+            self._column_events, self._open_close_events(vertical)))
+
+
 class Grid:
     BIG_DIST = 999999
 
     def __init__(self, wires=None):
         self._wires = []
-        self._intersections = []
-        
+        self._intersections = set()
+        self._crossings = defaultdict(set)
+        self._index = SegmentIndex()
+        self._cache = {}
+
         if wires:
             self.add_wires(wires)
 
@@ -29,25 +208,120 @@ class Grid:
 
     @staticmethod
     def combined_step_distance(point, points):
-        print(points.index(point))
+        ''' Compute the number of steps to first reach a point along
+        a list of points
+
+        :param point: Point to find the steps to
+        :type point: tuple(int, int)
+        :param points: Points along a path, starting at the origin
+        :type points: list[tuple(int, int)]
+        :return: Number of steps to the point
+        '''
         return points.index(point)
 
+    @staticmethod
+    def split_segments(wire):
+        ''' Split the segments of a Wire into horizontal and vertical
+        segments, each normalized so the range is ascending
+
+        :param wire: Wire to split the segments for
+        :type wire: Wire
+        :return: Tuple of (horizontal, vertical) lists where horizontal
+                 segments are (y, x_min, x_max) and vertical segments
+                 are (x, y_min, y_max)
+        '''
+        horizontal = []
+        vertical = []
+        for (x0, y0), (x1, y1), steps in wire.segments:
+            if y0 == y1:
+                horizontal.append((y0, min(x0, x1), max(x0, x1)))
+            else:
+                vertical.append((x0, min(y0, y1), max(y0, y1)))
+        return horizontal, vertical
+
+    @classmethod
+    def labelled_segments(cls, wire, label):
+        ''' Split the segments of a Wire and label each of them
+
+        :param wire: Wire to split the segments for
+        :type wire: Wire
+        :param label: Label to report for these segments in queries
+        :type label: int
+        :return: Tuple of (horizontal, vertical) lists of labelled segments
+        '''
+        horizontal, vertical = cls.split_segments(wire)
+        return ([s + (label,) for s in horizontal],
+                [s + (label,) for s in vertical])
+
+    @classmethod
+    def wire_intersections(cls, wire1, wire2):
+        ''' Compute the intersections of two Wires from their segments
+
+        :param wire1: First Wire
+        :type wire1: Wire
+        :param wire2: Second Wire
+        :type wire2: Wire
+        :return: Set of intersection points (including the origin)
+        '''
+        index = SegmentIndex()
+        index.add(*cls.labelled_segments(wire1, 0))
+
+        intersections = {(0, 0)}
+        intersections.update(point for point, labels in index.query(
+            *cls.labelled_segments(wire2, 1)))
+        return intersections
+
     def _compute_intersections(self):
-        '''Compute the intesections of all Wires on Grid '''
-        # Check each wire against all others for intersections
-        for w1, w2 in itertools.combinations(self.wires, 2):
-            intersections = []
-            for i, p in enumerate(w1.points):
-                print("   Point {} of {}".format(i, len(w1.points)))
-                if p in w2.points:
-                    intersections.append(p)
-
-        # Remove origin point since will always be an intersection
-        intersections.remove((0,0))
-
-        # Set the intersections for the object
-        self._intersections = intersections
- 
+        ''' Recompute the intersections of all Wires on the Grid from
+        scratch. Intersections are otherwise only updated as Wires are
+        added, so this must be called after extending a Wire that is
+        already on the Grid.
+        '''
+        wires = self._wires
+        self._wires = []
+        self._intersections = set()
+        self._crossings = defaultdict(set)
+        self._index = SegmentIndex()
+        self._add_wires(wires)
+
+    def _add_wires(self, wires):
+        ''' Add Wires to the Grid, updating the intersections with one
+        sweep of the new Wires against the shared segment index
+
+        :param wires: Wires to add to the Grid
+        :type wires: list[Wire]
+        '''
+        horizontal = []
+        vertical = []
+        for label, wire in enumerate(wires, len(self._wires)):
+            segments = self.labelled_segments(wire, label)
+            horizontal.extend(segments[0])
+            vertical.extend(segments[1])
+
+        for point, labels in self._index.query(horizontal, vertical):
+            # Remove origin point since will always be an intersection
+            if point != (0, 0):
+                self._crossings[point].update(labels)
+                self._intersections.add(point)
+
+        self._index.add(horizontal, vertical)
+        self._wires.extend(wires)
+        self._cache.clear()
+
+    def _cached(self, key, compute):
+        ''' Get a derived result from the cache, computing it if the
+        cache was invalidated since it was last requested
+
+        :param key: Name of the cached result
+        :type key: str
+        :param compute: Function to compute the result on a cache miss
+        :type compute: callable
+        :return: The cached result
+        '''
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
     def _compute_closest_intersection(self):
         ''' Compute the closest intersection to the origin
         Example: point, dist = self._compute_closest_intersection()
@@ -78,10 +352,9 @@ class Grid:
         :type wire: Wire or list[Wire]
         '''
         if isinstance(wires, list):
-            for wire in wires:
-                self._wires.append(wire)
+            self._add_wires(wires)
         else:
-            self._wires.append(wires)
+            self._add_wires([wires])
 
     @property
     def wires(self):
@@ -91,29 +364,67 @@ class Grid:
     @property
     def intersections(self):
         ''' Gets the current intersections of all Wires on the Grid '''
-        self._compute_intersections()
-        return sorted(self._intersections)
-      
+        return self._cached('intersections',
+                            lambda: sorted(self._intersections))
+
+    @property
+    def crossings(self):
+        ''' Gets a map of each intersection to the indices of the Wires
+        that cross there '''
+        return self._cached('crossings', lambda: {
+            point: tuple(sorted(labels))
+            for point, labels in self._crossings.items()})
+
+    @property
+    def pairwise_intersections(self):
+        ''' Gets a map of each pair of Wire indices to their intersections '''
+        return self._cached('pairwise', self._compute_pairwise_intersections)
+
+    def _compute_pairwise_intersections(self):
+        ''' Compute the intersections for each pair of Wires that cross '''
+        pairwise = defaultdict(list)
+        for point, labels in self.crossings.items():
+            for pair in itertools.combinations(labels, 2):
+                pairwise[pair].append(point)
+        return {pair: sorted(points) for pair, points in pairwise.items()}
+
+    def k_way_intersections(self, k):
+        ''' Gets the intersections crossed by at least k Wires
+
+        :param k: Minimum number of Wires crossing at the intersection
+        :type k: int
+        :return: Sorted list of intersection points
+        '''
+        return sorted(point for point, labels in self._crossings.items()
+                      if len(labels) >= k)
+
     @property
     def closest_intersection(self):
         ''' Gets the closest intersection to the origin on the Grid '''
-        intersection, distance = self._compute_closest_intersection()
+        intersection, distance = self._cached(
+            'closest', self._compute_closest_intersection)
         return intersection
 
     @property
     def closest_intersection_distance(self):
         ''' Gets the closest intersection distance to the origin on the Grid '''
-        intersection, distance = self._compute_closest_intersection()
+        intersection, distance = self._cached(
+            'closest', self._compute_closest_intersection)
         return distance
 
     @property
     def closest_combined_step_distance(self):
+        ''' Gets the smallest combined steps of all Wires to reach an
+        intersection on the Grid '''
+        return self._cached('combined_step',
+                            self._compute_closest_combined_step_distance)
+
+    def _compute_closest_combined_step_distance(self):
+        ''' Compute the smallest combined steps of all Wires to reach
+        an intersection on the Grid '''
         combined_step_per_intersection = []
-        for point in self.intersections:
-            distances = []
-            for wire in self.wires:
-                distance = self.combined_step_distance(point, wire.points)
-                distances.append(distance)
+        for point, labels in self.crossings.items():
+            distances = [self.wires[i].steps_to(point) for i in labels]
             combined_step_per_intersection.append(sum(distances))
         return min(combined_step_per_intersection)
 
@@ -128,16 +439,12 @@ if __name__ == "__main__":
                         help="Either sovling part 1 or part 2 of problem")
     args = parser.parse_args()
 
-    # Read in input file with list of masses and parse
+    # Read in input file with a wire per line, streaming each line
     with open(args.input_file, 'r') as f:
-        contents = f.readlines()
+        wires = list(Wire.iter_from_stream(f))
 
-    wires = []
-    for instructions in contents:
-        wires.append(Wire(instructions))
+    assert len(wires) >= 2
 
-    assert len(wires) == 2
-    
     grid = Grid(wires)
     if args.part == 1:
         msg = "Closest intersection: {} Distance: {}"
@@ -35,6 +35,12 @@ def test_compute_instersections(wire_one, wire_two):
     grid._compute_intersections()
     assert grid.intersections == [(3,3), (6,5)]
 
+    # Extending a Wire on the Grid needs the intersections recomputed
+    wire_two.extend_points_from_instructions("U2,R1")
+    assert grid.intersections == [(3,3), (6,5)]
+    grid._compute_intersections()
+    assert grid.intersections == [(3,3), (3,5), (6,5)]
+
 def test_closest_intersection(wire_one, wire_two):
     wires = [wire_one, wire_two]
     grid = Grid(wires)
@@ -67,3 +73,72 @@ def test_combined_step_distance(wire_one, wire_two):
     assert Grid.combined_step_distance((3,3), wire_two.points) == 20
     assert Grid.combined_step_distance((6,5), wire_one.points) == 15 
     assert Grid.combined_step_distance((6,5), wire_two.points) == 15
+
+
+def test_split_segments(wire_one):
+    horizontal, vertical = Grid.split_segments(wire_one)
+    assert horizontal == [(0, 0, 8), (5, 3, 8)]
+    assert vertical == [(8, 0, 5), (3, 2, 5)]
+
+
+def test_wire_intersections_collinear():
+    wire_one = Wire("R5,U2")
+    wire_two = Wire("U1,R2,D1,R4")
+    intersections = Grid.wire_intersections(wire_one, wire_two)
+    assert intersections == {(0, 0), (2, 0), (3, 0), (4, 0), (5, 0)}
+
+
+def test_intersections_match_points():
+    wire_one = Wire("R75,D30,R83,U83,L12,D49,R71,U7,L72")
+    wire_two = Wire("U62,R66,U55,R34,D71,R55,D58,R83")
+    grid = Grid([wire_one, wire_two])
+    target = set(wire_one.points) & set(wire_two.points)
+    target.discard((0, 0))
+    assert grid.intersections == sorted(target)
+    assert grid.closest_intersection_distance == 159
+
+
+def test_intersections_cached(wire_one, wire_two):
+    grid = Grid(wire_one)
+    assert grid.intersections == []
+
+    grid.add_wires(wire_two)
+    assert grid.intersections == [(3,3), (6,5)]
+    assert grid.intersections is grid.intersections
+    assert grid.closest_intersection == (3,3)
+
+    grid.add_wires(Wire("U1,R1"))
+    assert grid.intersections == [(0,1), (3,3), (6,5)]
+    assert grid.closest_intersection == (0,1)
+
+
+def test_many_wires(wire_one, wire_two):
+    wire_three = Wire("U3,R3")
+    grid = Grid([wire_one, wire_two, wire_three])
+    assert grid.intersections == [(0,1), (0,2), (0,3), (2,3), (3,3), (6,5)]
+    assert grid.crossings[(3,3)] == (0, 1, 2)
+    assert grid.crossings[(0,2)] == (1, 2)
+    assert grid.pairwise_intersections[(0, 1)] == [(3,3), (6,5)]
+    assert grid.pairwise_intersections[(0, 2)] == [(3,3)]
+    assert grid.k_way_intersections(3) == [(3,3)]
+    assert grid.closest_intersection_distance == 1
+    assert grid.closest_combined_step_distance == 2
+
+
+def test_add_wires_in_batches(wire_one, wire_two):
+    wires = [wire_one, wire_two, Wire("U3,R3"), Wire("R4,U5,L1"),
+             Wire("R6,U1,L6")]
+    grid = Grid(wires)
+
+    incremental = Grid(wires[:2])
+    for wire in wires[2:]:
+        incremental.add_wires(wire)
+    assert incremental.crossings == grid.crossings
+
+    target = {}
+    for label, wire in enumerate(wires):
+        for point in set(wire.points) - {(0, 0)}:
+            target.setdefault(point, set()).add(label)
+    assert grid.crossings == {point: tuple(sorted(labels))
+                              for point, labels in target.items()
+                              if len(labels) > 1}
@@ -1,6 +1,8 @@
+import io
+import mmap
 import pytest
 
-from wire import Wire, UnknownDirectionException, InvalidInstructionFormat
+from wire import Wire, PointArray, UnknownDirectionException, InvalidInstructionFormat
 
 
 def test_construction():
@@ -80,3 +82,82 @@ def test_points_from_instructions():
     wire = Wire()
     wire.extend_points_from_instructions("U2,R2")
     assert wire.points == [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2)]
+
+
+def test_step_map():
+    wire = Wire("R2,U1,L1,D1")
+    assert wire.step_map == {(0, 0): 0, (1, 0): 1, (2, 0): 2,
+                             (2, 1): 3, (1, 1): 4}
+    assert wire.steps_to((1, 0)) == 1
+
+    with pytest.raises(ValueError):
+        wire.steps_to((5, 5))
+
+    wire.extend_points_from_instructions("R3")
+    assert wire.steps_to((3, 0)) == 7
+
+    # The existing map is extended and keeps the first visits
+    step_map = wire.step_map
+    wire.extend_points_from_instructions("L2,U1")
+    assert wire.step_map is step_map
+    assert wire.steps_to((2, 0)) == 2
+    assert wire.steps_to((1, 1)) == 4
+    assert wire.step_map == wire._build_step_map()
+
+
+def test_compact_points():
+    instructions = "U2,R2,D3,L1"
+    wire = Wire(instructions, compact=True)
+    target = Wire(instructions).points
+
+    assert isinstance(wire.points, PointArray)
+    assert len(wire.points) == len(target)
+    assert wire.points == target
+    assert list(wire.points) == target
+    assert wire.points[3] == (1, 2)
+    assert wire.points[-1] == (1, -1)
+    assert wire.points.index((2, 0)) == 6
+
+
+def test_iter_instructions():
+    stream = io.StringIO("U2,R22,D3\nL1\n")
+    assert list(Wire.iter_instructions(stream, chunk_size=4)) == ["U2", "R22", "D3"]
+    assert list(Wire.iter_instructions(stream, chunk_size=4)) == ["L1"]
+    assert list(Wire.iter_instructions(stream, chunk_size=4)) == []
+
+    stream = io.BytesIO(b"U2,R2")
+    assert list(Wire.iter_instructions(stream)) == ["U2", "R2"]
+
+
+def test_from_stream():
+    stream = io.StringIO("U2,R2\nD1")
+    wire = Wire.from_stream(stream, chunk_size=3)
+    assert wire.points == [(0,0), (0,1), (0,2), (1,2), (2,2)]
+
+    wire = Wire.from_stream(stream, chunk_size=3)
+    assert wire.points == [(0,0), (0,-1)]
+
+    with pytest.raises(InvalidInstructionFormat):
+        Wire.from_stream(io.StringIO("U2,X2"))
+
+
+def test_iter_instructions_mmap(tmp_path):
+    path = tmp_path / "input"
+    path.write_bytes(b"U2,R22,D3\nL1\n")
+    with open(str(path), 'rb') as f:
+        stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        assert list(Wire.iter_instructions(stream, chunk_size=4)) == \
+            ["U2", "R22", "D3"]
+        assert list(Wire.iter_instructions(stream, chunk_size=4)) == ["L1"]
+        assert list(Wire.iter_instructions(stream, chunk_size=4)) == []
+        stream.close()
+
+
+def test_iter_from_stream():
+    # Blank lines and wires without segments do not end the stream
+    stream = io.StringIO("U2,R2\n\nR0\nD1\n")
+    wires = list(Wire.iter_from_stream(stream, chunk_size=3))
+    assert len(wires) == 3
+    assert wires[0].points == [(0,0), (0,1), (0,2), (1,2), (2,2)]
+    assert not wires[1].segments
+    assert wires[2].points == [(0,0), (0,-1)]
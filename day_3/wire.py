@@ -1,5 +1,12 @@
+import mmap
 import re
-from operator import add
+from array import array
+from operator import add, mul
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
 
 
 class UnknownDirectionException(Exception):
@@ -10,6 +17,50 @@ class InvalidInstructionFormat(Exception):
     ''' Raised if an invalid instruction is found '''
 
 
+class PointArray(Sequence):
+    ''' Compact, read-only sequence of points stored as two columns of
+    32-bit integers instead of a list of tuples
+    '''
+
+    def __init__(self, xs=None, ys=None):
+        ''' Construction for a PointArray object
+
+        :param xs: Column of x coordinates
+        :type xs: array('i')
+        :param ys: Column of y coordinates
+        :type ys: array('i')
+        '''
+        self._xs = xs if xs is not None else array('i')
+        self._ys = ys if ys is not None else array('i')
+
+    def __len__(self):
+        return len(self._xs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self._xs[index], self._ys[index])
+        return (self._xs[index], self._ys[index])
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            p == tuple(q) for p, q in zip(self, other))
+
+    def __repr__(self):
+        return "PointArray({})".format(list(self))
+
+    @property
+    def xs(self):
+        ''' Gets the column of x coordinates '''
+        return self._xs
+
+    @property
+    def ys(self):
+        ''' Gets the column of y coordinates '''
+        return self._ys
+
+
 class Wire:
     ''' Wire class for creating list of points for a given
     wire's instructions
@@ -25,16 +76,24 @@ class Wire:
     SHIFT_UP = (0, 1)
     SHIFT_DOWN = (0, -1)
 
-    def __init__(self, wire_instructions=None):
+    def __init__(self, wire_instructions=None, compact=False):
         ''' Construction for a Wire object
 
         :param wire_instructions: Instructions for creating wire's path
                                   Example: "U2,D3,R1,L4" for a path of
                                   Up by 2, Down by 3, Right by 1, and Left by 4
         :type wire_instructions: str
+        :param compact: Store the points as a PointArray of 32-bit integer
+                        columns instead of a list of tuples (default: False)
+        :type compact: bool
         '''
+        self._compact = compact
         self._instructions = ""
-        self._points = [(0, 0)]
+        self._segments = []
+        self._last_point = (0, 0)
+        self._length = 0
+        self._points = None
+        self._step_map = None
 
         instruction_format = r"^[DLRU]\d+$"
         self._instruction_regex = re.compile(instruction_format)
@@ -56,36 +115,61 @@ class Wire:
         '''
         return tuple(map(add, point1, point2))
 
-    def _direction_to_point(self, direction):
-        '''Takes a direction instruction and creates a new point
-        using the last point added to the Wire
+    @staticmethod
+    def scale_point(point, factor):
+        ''' Scale a point element-wise by a factor to create a new point.
+        So, for point=(0,-1) and factor=3, the new point will be (0,-3).
+
+        :param point: Point to scale
+        :type point: tuple(int, int)
+        :param factor: Factor to scale the point by
+        :type factor: int
+        :return: New point from element-wise product as a tuple(int, int)
+        '''
+        return tuple(map(mul, point, (factor,) * len(point)))
+
+    def _direction_to_shift(self, direction):
+        '''Takes a direction instruction and returns the unit shift
+        for a single step in that direction
 
         :param direction: String with direction instructions.
                           Choices: "U", "D", "R", "L"
-                          Suggested to use the Wire class constants
-                          UP, DOWN, RIGHT, and LEFT (ie Wire.UP)
         :type direction: str
         :return: tuple
         '''
-
         if direction == self.RIGHT:
-            point = self.add_points(self.last_point, self.SHIFT_RIGHT)
+            shift = self.SHIFT_RIGHT
         elif direction == self.LEFT:
-            point = self.add_points(self.last_point, self.SHIFT_LEFT)
+            shift = self.SHIFT_LEFT
         elif direction == self.UP:
-            point = self.add_points(self.last_point, self.SHIFT_UP)
+            shift = self.SHIFT_UP
         elif direction == self.DOWN:
-            point = self.add_points(self.last_point, self.SHIFT_DOWN)
+            shift = self.SHIFT_DOWN
         else:
             msg = "Direction: {} Choices: {}"
             msg = msg.format(direction, ','.join(self.DIRECTION_CHOICES))
             raise UnknownDirectionException(msg)
-        return point
+        return shift
+
+    def _direction_to_point(self, direction):
+        '''Takes a direction instruction and creates a new point
+        using the last point added to the Wire
+
+        :param direction: String with direction instructions.
+                          Choices: "U", "D", "R", "L"
+                          Suggested to use the Wire class constants
+                          UP, DOWN, RIGHT, and LEFT (ie Wire.UP)
+        :type direction: str
+        :return: tuple
+        '''
+        shift = self._direction_to_shift(direction)
+        return self.add_points(self.last_point, shift)
 
     def _extend_points_from_single_instruction(self, instruction):
         ''' Extend / add new points to the wire from a single instruction,
         such as "U22" or "D5". These will add 22 and 5 new points,
-        respectively, to the Wire object.
+        respectively, to the Wire object. The points are stored as a
+        single axis-aligned segment and only expanded when requested.
 
         :param instruction: Single instruction string
                             with format "[UDLR][0-9]+"
@@ -97,10 +181,59 @@ class Wire:
 
         direction = instruction[0]
         iterations = int(instruction[1:])
+        if iterations == 0:
+            return
+
+        shift = self._direction_to_shift(direction)
+        start = self._last_point
+        stop = self.add_points(start, self.scale_point(shift, iterations))
+
+        segment = (start, stop, self._length)
+        self._segments.append(segment)
+        self._last_point = stop
+        self._length += iterations
+        self._points = None
+        # Only the new segment can add points to an existing step map
+        if self._step_map is not None:
+            self._map_segment_steps(self._step_map, segment)
+
+    def _expand_points(self):
+        ''' Expand the segments of the Wire into the list of every
+        point visited along the path, starting from the origin
+
+        :return: List of points as tuple(int, int)
+        '''
+        points = [(0, 0)]
+        for start, stop, steps in self._segments:
+            (x0, y0), (x1, y1) = start, stop
+            dx = (x1 > x0) - (x1 < x0)
+            dy = (y1 > y0) - (y1 < y0)
+            length = abs(x1 - x0) + abs(y1 - y0)
+            points.extend((x0 + dx * i, y0 + dy * i)
+                          for i in range(1, length + 1))
+        return points
+
+    def _expand_point_array(self):
+        ''' Expand the segments of the Wire into a PointArray of every
+        point visited along the path, starting from the origin. Each
+        segment fills a run of one column from a range and repeats the
+        fixed coordinate in the other column.
 
-        for i in range(1, iterations + 1):
-            point = self._direction_to_point(direction)
-            self._points.extend([point])
+        :return: PointArray of points
+        '''
+        xs = array('i', [0])
+        ys = array('i', [0])
+        for start, stop, steps in self._segments:
+            (x0, y0), (x1, y1) = start, stop
+            if y0 == y1:
+                step = 1 if x1 > x0 else -1
+                xs.extend(range(x0 + step, x1 + step, step))
+                ys.extend(array('i', [y0]) * abs(x1 - x0))
+            else:
+                step = 1 if y1 > y0 else -1
+                xs.extend(array('i', [x0]) * abs(y1 - y0))
+                ys.extend(range(y0 + step, y1 + step, step))
+        return PointArray(xs, ys)
 
     def extend_points_from_instructions(self, instructions):
         ''' Extend / add new points to the wire from a set of instructions,
@@ -113,6 +246,151 @@ class Wire:
         for instruction in instructions.split(','):
             self._extend_points_from_single_instruction(instruction)
 
+    @staticmethod
+    def _read_line_chunk(stream, chunk_size):
+        ''' Read up to chunk_size characters from a stream, stopping after
+        the end of the line. Memory-mapped files have no sized readline, so
+        the end of the line is found in the map instead.
+        '''
+        if isinstance(stream, mmap.mmap):
+            start = stream.tell()
+            end = stream.find(b'\n', start, start + chunk_size)
+            return stream.read(end + 1 - start if end >= 0 else chunk_size)
+        return stream.readline(chunk_size)
+
+    @staticmethod
+    def iter_instructions(stream, chunk_size=65536):
+        ''' Lazily read the comma-separated instructions for a single
+        wire from a stream, stopping at the end of the line. At most
+        chunk_size characters are read at a time, so the memory used does
+        not depend on the length of the line.
+
+        :param stream: Text or binary file object, or memory-mapped file,
+                       positioned at the start of a line of instructions
+        :type stream: file or mmap.mmap
+        :param chunk_size: Maximum number of characters read at a time
+        :type chunk_size: int
+        :return: Generator of single instruction strings
+        '''
+        remainder = ''
+        while True:
+            chunk = Wire._read_line_chunk(stream, chunk_size)
+            if not chunk:
+                break
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode()
+
+            tokens = (remainder + chunk).split(',')
+            remainder = tokens.pop()
+            for token in tokens:
+                yield token.strip()
+
+            if chunk.endswith('\n'):
+                break
+
+        remainder = remainder.strip()
+        if remainder:
+            yield remainder
+
+    def extend_points_from_stream(self, stream, chunk_size=65536):
+        ''' Extend / add new points to the wire from a line of instructions
+        read incrementally from a stream. The instructions are not kept
+        on the Wire, only the segments they produce.
+
+        :param stream: Text or binary file object positioned at the start
+                       of a line of instructions
+        :type stream: file
+        :param chunk_size: Maximum number of characters read at a time
+        :type chunk_size: int
+        '''
+        for instruction in self.iter_instructions(stream, chunk_size):
+            self._extend_points_from_single_instruction(instruction)
+
+    @classmethod
+    def from_stream(cls, stream, chunk_size=65536, compact=False):
+        ''' Create a Wire from a line of instructions read incrementally
+        from a stream. See Wire.extend_points_from_stream
+
+        :param stream: Text or binary file object positioned at the start
+                       of a line of instructions
+        :type stream: file
+        :param chunk_size: Maximum number of characters read at a time
+        :type chunk_size: int
+        :param compact: Store the points as a PointArray (default: False)
+        :type compact: bool
+        :return: New Wire object
+        '''
+        wire = cls(compact=compact)
+        wire.extend_points_from_stream(stream, chunk_size)
+        return wire
+
+    @classmethod
+    def iter_from_stream(cls, stream, chunk_size=65536, compact=False):
+        ''' Create a Wire for each line of instructions in a stream, up to
+        the end of the stream. Blank lines are skipped.
+
+        :param stream: Text or binary file object, or memory-mapped file
+        :type stream: file or mmap.mmap
+        :param chunk_size: Maximum number of characters read at a time
+        :type chunk_size: int
+        :param compact: Store the points as a PointArray (default: False)
+        :type compact: bool
+        :return: Generator of Wire objects
+        '''
+        while True:
+            position = stream.tell()
+            wire = cls(compact=compact)
+            instructions = 0
+            for instruction in cls.iter_instructions(stream, chunk_size):
+                wire._extend_points_from_single_instruction(instruction)
+                instructions += 1
+
+            if stream.tell() == position:
+                return
+            if instructions:
+                yield wire
+
+    @staticmethod
+    def _map_segment_steps(step_map, segment):
+        ''' Add the points of a single segment to a step map, keeping
+        the steps of points that were already visited
+
+        :param step_map: Dictionary of point tuple(int, int) to steps
+        :type step_map: dict
+        :param segment: Segment as (start, stop, steps)
+        :type segment: tuple
+        '''
+        (x0, y0), (x1, y1), steps = segment
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        length = abs(x1 - x0) + abs(y1 - y0)
+        for i in range(1, length + 1):
+            step_map.setdefault((x0 + dx * i, y0 + dy * i), steps + i)
+
+    def _build_step_map(self):
+        ''' Build a map of each point visited by the Wire to the number
+        of steps taken to first reach it, walking the segments in order
+
+        :return: Dictionary of point tuple(int, int) to steps
+        '''
+        step_map = {(0, 0): 0}
+        for segment in self._segments:
+            self._map_segment_steps(step_map, segment)
+        return step_map
+
+    def steps_to(self, point):
+        ''' Gets the number of steps along the Wire to first reach a point
+
+        :param point: Point on the Wire
+        :type point: tuple(int, int)
+        :return: Number of steps to the first visit of the point
+        :raises ValueError: If the point is not on the Wire
+        '''
+        try:
+            return self.step_map[point]
+        except KeyError:
+            raise ValueError("Point {} is not on the Wire".format(point))
+
     @property
     def instructions(self):
         ''' Gets the current instruction set for the Wire '''
@@ -124,12 +402,37 @@ class Wire:
         self._instructions = instructions
         self.extend_points_from_instructions(instructions)
 
+    @property
+    def segments(self):
+        ''' Gets the current segments for the Wire as a list of
+        (start, stop, steps) tuples, where steps is the number of steps
+        taken along the Wire to reach the start point
+        '''
+        return self._segments
+
     @property
     def points(self):
         ''' Gets the current points for the Wire '''
+        if self._points is None:
+            if self._compact:
+                self._points = self._expand_point_array()
+            else:
+                self._points = self._expand_points()
         return self._points
 
+    @property
+    def step_map(self):
+        ''' Gets the map of points to first-visit steps for the Wire '''
+        if self._step_map is None:
+            self._step_map = self._build_step_map()
+        return self._step_map
+
     @property
     def last_point(self):
         ''' Gets the last point added to the Wire '''
-        return self._points[-1]
+        return self._last_point
+
+    @property
+    def length(self):
+        ''' Gets the total number of steps along the Wire '''
+        return self._length
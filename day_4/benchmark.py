@@ -0,0 +1,58 @@
+import argparse
+import random
+import timeit
+
+from secure import PasswordValidator, numpy
+
+
+def count_valid_passwords_classmethods(passwords):
+    '''
+    Reference counter that runs the separate per-password classmethods,
+    as the part one and part two properties did before the fused pass.
+    '''
+    part_one = part_two = 0
+    for p in passwords:
+        valid = PasswordValidator.validate_password_length(p)
+        valid = PasswordValidator.validate_two_adjacent_digits(p) & valid
+        valid = PasswordValidator.validate_not_decreasing(p) & valid
+        if valid:
+            part_one += 1
+            if PasswordValidator.validate_repeated_elements(p):
+                part_two += 1
+    return part_one, part_two
+
+
+def time_call(function, passwords, number):
+    ''' Best time in seconds of a single call over a few repeats '''
+    timer = timeit.Timer(lambda: function(passwords))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+
+if __name__ == "__main__":
+    # Parse CLI arguements
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000,
+                        help="Number of random candidate passwords")
+    parser.add_argument("--number", type=int, default=1,
+                        help="Number of calls per timing")
+    args = parser.parse_args()
+
+    # Random candidates, so they are not a contiguous range
+    passwords = random.sample(range(100000, 1000000), args.size)
+    batch = numpy.array(passwords) if numpy is not None else passwords
+    counters = [
+        ("classmethods", count_valid_passwords_classmethods, passwords),
+        ("fused", PasswordValidator.count_valid_password_stream, passwords),
+        ("batch", PasswordValidator.count_valid_passwords_batch, batch),
+    ]
+
+    counts = [counter(candidates) for _, counter, candidates in counters]
+    assert all(c == counts[0] for c in counts)
+
+    print("Valid passwords (part 1, part 2): {}".format(counts[0]))
+    reference = None
+    for name, counter, candidates in counters:
+        seconds = time_call(counter, candidates, args.number)
+        reference = reference or seconds
+        print("{:>12}: {:10.3e} s {:8.1f}x".format(
+            name, seconds, reference / seconds))
@@ -1,18 +1,98 @@
 import argparse
 import itertools
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from functools import lru_cache
 
-def expand_ints(s):
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class IntRanges(Sequence):
+    # Lazy, read-only sequence of the integers in a list of ranges,
+    # followed by a list of isolated integers. The integers in the ranges
+    # are only produced while iterating, so memory does not grow with the
+    # width of the ranges. Indexing bisects the cumulative lengths of the
+    # ranges.
+    def __init__(self, ranges=None, values=None):
+        self._ranges = list(ranges) if ranges else []
+        self._values = values[:] if values is not None else []
+        self._ends = list(itertools.accumulate(len(r) for r in self._ranges))
+
+    def __len__(self):
+        return (self._ends[-1] if self._ends else 0) + len(self._values)
+
+    def __iter__(self):
+        return itertools.chain(itertools.chain.from_iterable(self._ranges),
+                               self._values)
+
+    def __contains__(self, value):
+        return any(value in r for r in self._ranges) or value in self._values
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("IntRanges index out of range")
+
+        i = bisect_right(self._ends, index)
+        if i == len(self._ranges):
+            return self._values[index - (self._ends[-1] if self._ends else 0)]
+        return self._ranges[i][index - (self._ends[i - 1] if i else 0)]
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        if not self._values:
+            return "IntRanges({})".format(self._ranges)
+        return "IntRanges({}, {})".format(self._ranges, list(self._values))
+
+    @property
+    def ranges(self):
+        return self._ranges
+
+    @property
+    def values(self):
+        return self._values
+
+def expand_ranges(s):
     spans = (el.partition('-')[::2] for el in s.split(','))
-    ranges = (range(int(s), int(e) + 1 if e else int(s) + 1)
-              for s, e in spans)
-    all_nums = itertools.chain.from_iterable(ranges)
-    return list(all_nums)
+    return [range(int(s), int(e) + 1 if e else int(s) + 1)
+            for s, e in spans]
+
+def expand_ints(s):
+    return IntRanges(expand_ranges(s))
 
 class PasswordValidator:
+    # Ranges with fewer passwords are validated one at a time rather than
+    # counted by count_valid_passwords
+    COUNT_RANGE_SIZE = 16
+
     def __init__(self, passwords=None):
-        self._passwords = []
+        # Ranges of passwords are kept as they are and counted without
+        # visiting every password. Passwords added one at a time, including
+        # those from other iterables, are kept in a typed array unless they
+        # follow the last password or range, so a contiguous stream is kept
+        # in constant memory.
+        self._ranges = []
+        self._values = array('q')
+        self._passwords = None
+        if isinstance(passwords, range):
+            passwords = IntRanges([passwords])
 
-        if passwords:
+        if isinstance(passwords, IntRanges):
+            self._ranges.extend(passwords.ranges)
+            for p in passwords.values:
+                self._add_value(p)
+        elif passwords:
             for p in passwords:
                 self.add_password(p)
 
@@ -38,7 +118,26 @@ class PasswordValidator:
         return password_list == sorted(password_list)
 
     def add_password(self, password):
-        self._passwords.append(password)
+        password = int(password)
+        self._passwords = None
+        if self._values and self._values[-1] + 1 == password:
+            start = self._values.pop()
+            self._ranges.append(range(start, password + 1))
+            return
+        if self._ranges:
+            last = self._ranges[-1]
+            if last.step == 1 and last.stop == password:
+                self._ranges[-1] = range(last.start, password + 1)
+                return
+        self._add_value(password)
+
+    def _add_value(self, password):
+        # Passwords beyond 64 bits switch the array to a list of ints
+        try:
+            self._values.append(password)
+        except OverflowError:
+            self._values = list(self._values)
+            self._values.append(password)
 
     @classmethod
     def validate_repeated_elements(cls, password, repeated=2):
@@ -54,31 +153,221 @@ class PasswordValidator:
         return False
             
 
+    @classmethod
+    def validate_password(cls, password, length=6):
+        # Check every rule in one pass over the digits, stopping at the
+        # first decreasing digit. Returns whether the password is valid for
+        # part one and for part two.
+        digits = str(password)
+        if len(digits) != length:
+            return False, False
+
+        paired = exact = False
+        previous, run = digits[0], 1
+        for digit in digits[1:]:
+            if digit == previous:
+                run += 1
+                continue
+            if digit < previous:
+                return False, False
+            paired = paired or run >= 2
+            exact = exact or run == 2
+            previous, run = digit, 1
+        return paired or run >= 2, exact or run == 2
+
+    @staticmethod
+    def next_not_decreasing(password):
+        # Smallest non-decreasing number at or above password, found by
+        # repeating the digit before the first decrease, ie 123400 -> 123444
+        digits = str(password)
+        for i in range(1, len(digits)):
+            if digits[i] < digits[i - 1]:
+                digits = digits[:i] + digits[i - 1] * (len(digits) - i)
+                return int(digits)
+        return password
+
+    @classmethod
+    def iter_valid_passwords(cls, first, last, part=1, length=6):
+        # Yield the valid passwords for a part in the inclusive range
+        # first-last in sorted order. Only non-decreasing numbers are
+        # visited, jumping from each one to the next with
+        # next_not_decreasing. A length of None allows any length.
+        if length is not None:
+            first = max(first, 10 ** (length - 1) if length > 1 else 0)
+            last = min(last, 10 ** length - 1)
+
+        password = max(first, 0)
+        while True:
+            password = cls.next_not_decreasing(password)
+            if password > last:
+                return
+            n = length if length is not None else len(str(password))
+            if cls.validate_password(password, n)[part - 1]:
+                yield password
+            password += 1
+
+    @classmethod
+    def count_valid_password_stream(cls, passwords):
+        # Count the valid passwords for part one and part two together in
+        # a single pass over any iterable of passwords
+        part_one = part_two = 0
+        validate_password = cls.validate_password
+        for p in passwords:
+            valid_one, valid_two = validate_password(p)
+            part_one += valid_one
+            part_two += valid_two
+        return part_one, part_two
+
+    @classmethod
+    def validate_passwords_batch(cls, passwords, length=6):
+        # Validate a batch of passwords at once, returning masks of the
+        # valid passwords for part one and part two. With NumPy the
+        # passwords become a matrix of digits and the rules are checked on
+        # the differences between neighbouring digits, otherwise each
+        # password goes through validate_password.
+        if numpy is None:
+            masks = [cls.validate_password(p, length) for p in passwords]
+            return [m[0] for m in masks], [m[1] for m in masks]
+
+        passwords = numpy.asarray(passwords, dtype=numpy.int64)
+        lower = 10 ** (length - 1) if length > 1 else 0
+        in_length = (passwords >= lower) & (passwords < 10 ** length)
+
+        # Digits of up to 9 places fit in 32-bit integers, which divide
+        # faster than 64-bit ones. The matrix has a row per digit place so
+        # the rules reduce over long contiguous rows.
+        dtype = numpy.int32 if length <= 9 else numpy.int64
+        powers = 10 ** numpy.arange(length - 1, -1, -1, dtype=dtype)
+        digits = numpy.where(in_length, passwords, 0).astype(dtype)
+        digits = digits // powers[:, None] % 10
+
+        diffs = numpy.diff(digits, axis=0)
+        equal = diffs == 0
+        part_one = in_length & (diffs >= 0).all(axis=0) & equal.any(axis=0)
+
+        # An exact pair is a run of one equal neighbour on its own, only
+        # looked for in the passwords valid for part one
+        candidates = numpy.flatnonzero(part_one)
+        runs = numpy.pad(equal[:, candidates], ((1, 1), (0, 0)))
+        exact = runs[1:-1] & ~runs[:-2] & ~runs[2:]
+        part_two = numpy.zeros_like(part_one)
+        part_two[candidates] = exact.any(axis=0)
+        return part_one, part_two
+
+    @classmethod
+    def count_valid_passwords_batch(cls, passwords, length=6):
+        # Count the valid passwords for part one and part two in a batch,
+        # see validate_passwords_batch
+        part_one, part_two = cls.validate_passwords_batch(passwords, length)
+        if numpy is None:
+            return sum(part_one), sum(part_two)
+        return (int(numpy.count_nonzero(part_one)),
+                int(numpy.count_nonzero(part_two)))
+
+    @property
+    def number_of_valid_passwords(self):
+        # Count the valid passwords for part one and part two together,
+        # with contiguous ranges counted by count_valid_passwords and the
+        # isolated passwords validated as one batch
+        part_one = part_two = 0
+        if isinstance(self._values, array):
+            part_one, part_two = self.count_valid_passwords_batch(
+                self._values)
+        else:
+            part_one, part_two = self.count_valid_password_stream(
+                self._values)
+        for r in self._ranges:
+            if r.step == 1 and len(r) >= self.COUNT_RANGE_SIZE and r[0] >= 0:
+                counts = self.count_valid_passwords(r[0], r[-1])
+            else:
+                counts = self.count_valid_password_stream(r)
+            part_one += counts[0]
+            part_two += counts[1]
+        return part_one, part_two
+
     @property
     def number_of_valid_passwords_part_one(self):
-        number_valid = 0
-        for p in self.passwords:
-            valid = self.validate_password_length(p)
-            valid = self.validate_two_adjacent_digits(p) & valid 
-            valid = self.validate_not_decreasing(p) & valid
-            if valid:
-                number_valid += 1
-        return number_valid
+        return self.number_of_valid_passwords[0]
 
     @property
     def number_of_valid_passwords_part_two(self):
-        number_valid = 0
-        for p in self.passwords:
-            valid = self.validate_password_length(p)
-            valid = self.validate_two_adjacent_digits(p) & valid 
-            valid = self.validate_not_decreasing(p) & valid
-            valid = self.validate_repeated_elements(p) & valid
-            if valid:
-                number_valid += 1
-        return number_valid
+        return self.number_of_valid_passwords[1]
+
+    @staticmethod
+    def _extend_run(digit, run, paired, exact, next_digit):
+        # Append a digit to a non-decreasing prefix ending in a run of digit
+        # (run is capped at 3, a longer run can not be an exact pair)
+        if next_digit == digit:
+            return digit, min(run + 1, 3), paired, exact
+        return next_digit, 1, paired or run >= 2, exact or run == 2
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _count_completions(cls, remaining, digit, run, paired, exact):
+        # Count the non-decreasing ways to fill the remaining digits after
+        # a prefix, for part one and part two
+        if remaining == 0:
+            return int(paired or run >= 2), int(exact or run == 2)
+
+        part_one = part_two = 0
+        for next_digit in range(digit, 10):
+            state = cls._extend_run(digit, run, paired, exact, next_digit)
+            counts = cls._count_completions(remaining - 1, *state)
+            part_one += counts[0]
+            part_two += counts[1]
+        return part_one, part_two
+
+    @classmethod
+    def _count_valid_passwords_up_to(cls, bound, length):
+        # Count the valid passwords with the given length up to bound by
+        # walking the digits of bound and counting the completions of every
+        # smaller digit at each position
+        bound = min(bound, 10 ** length - 1)
+        if bound < 10 ** (length - 1):
+            return 0, 0
+
+        part_one = part_two = 0
+        state = (1, 0, False, False)
+        bound_list = cls.convert_password_to_list(bound)
+        for i, bound_digit in enumerate(bound_list):
+            if bound_digit < state[0]:
+                # The bound decreases here, nothing larger fits
+                return part_one, part_two
+
+            for next_digit in range(state[0], bound_digit):
+                counts = cls._count_completions(
+                    length - i - 1, *cls._extend_run(*state, next_digit))
+                part_one += counts[0]
+                part_two += counts[1]
+            state = cls._extend_run(*state, bound_digit)
+
+        counts = cls._count_completions(0, *state)
+        return part_one + counts[0], part_two + counts[1]
+
+    @classmethod
+    def count_valid_passwords(cls, first, last, length=6):
+        # Count the valid passwords for part one and part two in the
+        # inclusive range first-last without visiting each one. Only the
+        # non-decreasing digit sequences are counted, so the time depends
+        # on the number of digits rather than the size of the range. A
+        # length of None counts passwords of any length.
+        if length is None:
+            lengths = range(1, len(str(max(last, 1))) + 1)
+        else:
+            lengths = [length]
+
+        part_one = part_two = 0
+        for n in lengths:
+            upper = cls._count_valid_passwords_up_to(last, n)
+            lower = cls._count_valid_passwords_up_to(first - 1, n)
+            part_one += upper[0] - lower[0]
+            part_two += upper[1] - lower[1]
+        return part_one, part_two
 
     @property
     def passwords(self):
+        if self._passwords is None:
+            self._passwords = IntRanges(self._ranges, self._values)
         return self._passwords
 
 if __name__ == "__main__":
@@ -89,11 +378,18 @@ if __name__ == "__main__":
     parser.add_argument("--part", type=int, default=1,
                         choices=[1, 2],
                         help="Either sovling part 1 or part 2 of problem")
+    parser.add_argument("--list", action="store_true",
+                        help="Print the valid passwords before the count")
     args = parser.parse_args()
 
+    if args.list:
+        for r in expand_ranges(args.input):
+            if r:
+                for p in PasswordValidator.iter_valid_passwords(
+                        r[0], r[-1], part=args.part):
+                    print(p)
+
     passwords = expand_ints(args.input)
     pv = PasswordValidator(passwords)
-    if args.part == 1:
-        print("Number of valid passwords (Part 1): {}".format(pv.number_of_valid_passwords_part_one))
-    if args.part == 2:
-        print("Number of valid passwords (Part 2): {}".format(pv.number_of_valid_passwords_part_two))
+    number_valid = pv.number_of_valid_passwords[args.part - 1]
+    print("Number of valid passwords (Part {}): {}".format(args.part, number_valid))
@@ -1,9 +1,38 @@
-from secure import expand_ints, PasswordValidator
+import pytest
+
+import secure
+from secure import expand_ints, expand_ranges, IntRanges, PasswordValidator
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    ''' Run a test with NumPy and with the pure Python fallback '''
+    if request.param == "numpy":
+        if secure.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(secure, "numpy", None)
+    return request.param
 
 def test_expand_ints():
     s = "1-3, 8-9, 12"
     assert expand_ints(s) == [1,2,3,8,9,12]
 
+def test_expand_ints_lazy():
+    passwords = expand_ints("100000-999999,1200000-1300000")
+    assert isinstance(passwords, IntRanges)
+    assert len(passwords) == 900000 + 100001
+    assert passwords[0] == 100000
+    assert passwords[900000] == 1200000
+    assert passwords[-1] == 1300000
+    assert passwords[1:3] == [100001, 100002]
+    assert 1250000 in passwords
+    assert 1000000 not in passwords
+
+def test_expand_ranges():
+    s = "1-3, 8-9, 12"
+    assert expand_ranges(s) == [range(1, 4), range(8, 10), range(12, 13)]
+
 def test_construction():
     pv = PasswordValidator()
     assert not pv.passwords
@@ -15,6 +44,46 @@ def test_construction_with_passwords():
     assert pv.passwords == [password]
 
 
+def test_construction_with_ranges():
+    pv = PasswordValidator(expand_ints("111110-111112"))
+    pv.add_password(112233)
+    assert pv.passwords == [111110, 111111, 111112, 112233]
+    assert pv.number_of_valid_passwords == (3, 1)
+
+    # The passwords of a validator build an equal validator
+    copy = PasswordValidator(pv.passwords)
+    assert copy.passwords == pv.passwords
+    assert copy.number_of_valid_passwords == (3, 1)
+
+    pv = PasswordValidator(range(10 ** 15, 10 ** 16))
+    assert len(pv.passwords) == 9 * 10 ** 15
+    assert pv.number_of_valid_passwords == (0, 0)
+
+
+def test_construction_with_stream():
+    # Contiguous passwords from a generator are kept as a single range
+    pv = PasswordValidator(p for p in range(123000, 130001))
+    assert pv.passwords.ranges == [range(123000, 130001)]
+    target = PasswordValidator.count_valid_passwords(123000, 130000)
+    assert pv.number_of_valid_passwords == target
+
+
+def test_construction_with_isolated_passwords(backend):
+    # Isolated passwords are kept next to the ranges, not as ranges
+    passwords = [111111, 111113, 111115, 111116, 111117, 10 ** 20]
+    pv = PasswordValidator(passwords)
+    assert pv.passwords.ranges == [range(111115, 111118)]
+    assert list(pv.passwords.values) == [111111, 111113, 10 ** 20]
+    assert sorted(pv.passwords) == passwords
+    assert pv.passwords[3] == 111111
+    assert pv.passwords[-1] == 10 ** 20
+    assert pv.number_of_valid_passwords == (5, 0)
+
+    copy = PasswordValidator(pv.passwords)
+    assert copy.passwords == pv.passwords
+    assert copy.number_of_valid_passwords == (5, 0)
+
+
 def test_add_password():
     password = 111111
     pv = PasswordValidator()
@@ -84,6 +153,23 @@ def test_validate_repeated_elements():
     assert PasswordValidator.validate_repeated_elements(password) == True
 
 
+def test_validate_password():
+    assert PasswordValidator.validate_password(111111) == (True, False)
+    assert PasswordValidator.validate_password(223450) == (False, False)
+    assert PasswordValidator.validate_password(123789) == (False, False)
+    assert PasswordValidator.validate_password(112233) == (True, True)
+    assert PasswordValidator.validate_password(123444) == (True, False)
+    assert PasswordValidator.validate_password(111122) == (True, True)
+    assert PasswordValidator.validate_password(11122) == (False, False)
+    assert PasswordValidator.validate_password(11122, length=5) == (True, True)
+
+
+def test_number_of_valid_passwords():
+    passwords = [111111, 223450, 123789, 112233, 123444, 111122]
+    pv = PasswordValidator(passwords)
+    assert pv.number_of_valid_passwords == (4, 2)
+
+
 def test_number_of_valid_passwords_part_one():
     passwords = [111111, 223450, 123789]
     pv = PasswordValidator(passwords)
@@ -94,3 +180,67 @@ def test_number_of_valid_passwords_part_two():
     passwords = [112233, 123444, 111122]
     pv = PasswordValidator(passwords)
     assert pv.number_of_valid_passwords_part_two == 2
+
+
+def test_count_valid_passwords():
+    assert PasswordValidator.count_valid_passwords(111110, 111112) == (2, 0)
+
+    first, last = 123000, 130000
+    passwords = range(first, last + 1)
+    target = PasswordValidator.count_valid_password_stream(passwords)
+    assert PasswordValidator.count_valid_passwords(first, last) == target
+
+
+def test_count_valid_passwords_large_range():
+    first, last = 10 ** 15, 10 ** 16 - 1
+    counts = PasswordValidator.count_valid_passwords(first, last, length=16)
+    assert counts == PasswordValidator.count_valid_passwords(1, 10 ** 17,
+                                                             length=16)
+
+    # Any length adds up the counts for each length
+    total = PasswordValidator.count_valid_passwords(1, last, length=None)
+    by_length = [PasswordValidator.count_valid_passwords(1, last, length=n)
+                 for n in range(1, 17)]
+    assert total == tuple(map(sum, zip(*by_length)))
+
+
+def test_validate_passwords_batch(backend):
+    passwords = [111111, 223450, 123789, 112233, 123444, 111122, 11122]
+    part_one, part_two = PasswordValidator.validate_passwords_batch(passwords)
+    assert list(part_one) == [True, False, False, True, True, True, False]
+    assert list(part_two) == [False, False, False, True, False, True, False]
+
+    part_one, part_two = PasswordValidator.validate_passwords_batch(
+        [11122], length=5)
+    assert list(part_one) == [True]
+    assert list(part_two) == [True]
+
+
+def test_count_valid_passwords_batch(backend):
+    passwords = list(range(123000, 130000, 3)) + [111111, 5, 12345678]
+    target = PasswordValidator.count_valid_password_stream(passwords)
+    assert PasswordValidator.count_valid_passwords_batch(passwords) == target
+    assert PasswordValidator.count_valid_passwords_batch([]) == (0, 0)
+
+
+def test_next_not_decreasing():
+    assert PasswordValidator.next_not_decreasing(123400) == 123444
+    assert PasswordValidator.next_not_decreasing(123444) == 123444
+    assert PasswordValidator.next_not_decreasing(199999) == 199999
+    assert PasswordValidator.next_not_decreasing(200000) == 222222
+
+
+def test_iter_valid_passwords():
+    first, last = 123000, 130000
+    passwords = list(PasswordValidator.iter_valid_passwords(first, last))
+    assert passwords == [p for p in range(first, last + 1)
+                         if PasswordValidator.validate_password(p)[0]]
+
+    passwords = list(PasswordValidator.iter_valid_passwords(first, last,
+                                                            part=2))
+    assert passwords == [p for p in range(first, last + 1)
+                         if PasswordValidator.validate_password(p)[1]]
+
+    # Passwords outside of the length are skipped
+    passwords = PasswordValidator.iter_valid_passwords(1, 10 ** 7)
+    assert next(passwords) == 111111